@@ -0,0 +1,255 @@
+import re
+import time
+import base64
+import asyncio
+import threading
+import urllib.parse
+
+# Audio payload of a Google Translate TTS response line
+_GTTS_AUDIO = re.compile(r'jQ1olc","\[\\"(.*)\\"]')
+
+def _decode_gtts_audio(response):
+    """Return the MP3 audio carried by a Google Translate TTS response."""
+    for line in response.splitlines():
+        line = line.decode('utf-8', errors='replace')
+        if 'jQ1olc' in line:
+            match = _GTTS_AUDIO.search(line)
+            if match:
+                return base64.b64decode(match.group(1).encode('ascii'))
+    raise Exception("No audio in the TTS response")
+
+def _retry_after(value):
+    """Parse a Retry-After header given in seconds; None if absent or a date."""
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+class AdaptiveConcurrency:
+    """
+    Concurrency limit for the requests to one host that adapts to how the
+    host copes: it grows by one after a full window of requests whose
+    latency stays close to the best seen, and is halved on HTTP 429 or
+    when latency climbs (additive increase, multiplicative decrease, as in
+    TCP congestion control). Longer texts take longer to synthesize, so a
+    request's latency is compared with the best one of requests of about
+    the same size (within a factor of two), not with the fastest overall. An optional rate limit spaces out request
+    starts, and a throttled response holds back every request to the host
+    for its Retry-After delay.
+
+    Not thread-safe: used from the client's event loop only.
+    """
+    def __init__(self, initial=4, minimum=1, maximum=32, rate_limit=None, latency_tolerance=3.0):
+        """
+        Args:
+            initial (int): Starting number of concurrent requests
+            minimum (int): Lowest limit it can be cut to
+            maximum (int): Highest limit it can grow to
+            rate_limit (float): Maximum request starts per second, or None
+            latency_tolerance (float): Factor over the best latency seen
+                for the same request size at which the host counts as
+                overloaded
+        """
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = float(min(max(initial, self.minimum), self.maximum))
+        self.rate_limit = rate_limit
+        self.latency_tolerance = latency_tolerance
+        self.active = 0
+        self.latency = None
+        # Average ratio of latency to the best for the request size
+        self.load = None
+        # Best latency by request size bucket (bit length of the size)
+        self.best_latency = {}
+        self._successes = 0
+        self._next_start = 0.0
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._condition = None
+
+    async def acquire(self):
+        """Wait for a free slot and for the rate limit, then take the slot."""
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.active < int(self.limit))
+            self.active += 1
+        now = time.monotonic()
+        start = max(now, self._next_start, self._paused_until)
+        if self.rate_limit:
+            self._next_start = start + 1.0 / self.rate_limit
+        if start > now:
+            await asyncio.sleep(start - now)
+
+    async def release(self, latency=None, throttled=False, pause=None, size=0):
+        """
+        Give back a slot and adapt the limit to how the request went.
+
+        Args:
+            latency (float): Seconds the successful request took
+            throttled (bool): Whether the host refused the request as
+                too many (HTTP 429 or 503)
+            pause (float): Seconds to hold back all requests to the host
+            size (int): Size of the request body
+        """
+        now = time.monotonic()
+        if pause:
+            self._paused_until = max(self._paused_until, now + pause)
+        if throttled:
+            self._decrease(now)
+        elif latency is not None:
+            self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+            bucket = size.bit_length()
+            best = self.best_latency[bucket] = min(self.best_latency.get(bucket, latency), latency)
+            ratio = latency / best if best > 0 else 1.0
+            self.load = ratio if self.load is None else 0.8 * self.load + 0.2 * ratio
+            if self.load > self.latency_tolerance:
+                self._decrease(now)
+            else:
+                self._successes += 1
+                if self._successes >= int(self.limit):
+                    self._successes = 0
+                    self.limit = min(self.maximum, self.limit + 1)
+        async with self._condition:
+            self.active -= 1
+            self._condition.notify_all()
+
+    def _decrease(self, now):
+        # At most once per round trip, so one burst of refusals halves it once
+        if now - self._last_decrease < (self.latency or 0.0):
+            return
+        self._last_decrease = now
+        self._successes = 0
+        self.limit = max(self.minimum, self.limit / 2)
+
+class AsyncTTSClient:
+    """
+    Online TTS backend running on asyncio with a single pooled keep-alive
+    HTTP session (aiohttp), instead of a new connection per request.
+    Requests to each host go through an AdaptiveConcurrency limit, and
+    throttled requests are retried after backing off.
+
+    With no endpoint it speaks gTTS's Google Translate protocol: the text
+    is split and packed by gTTS, and its parts are requested concurrently.
+    With an endpoint it speaks the form protocol of HTTPTTSBackend (fields
+    "text" and "lang" in, audio bytes out). The backend names match those
+    two backends, so cached audio and checkpoints carry over.
+
+    synthesize() blocks and is thread-safe, so the client plugs into
+    SynthesisEngine; the requests themselves run on the client's own event
+    loop thread. Give the engine at least `max_concurrency` workers.
+    """
+    def __init__(self, endpoint=None, max_concurrency=32, initial_concurrency=4, rate_limit=None,
+                 timeout=30, throttle_retries=6, max_backoff=30.0, tld="com"):
+        """
+        Args:
+            endpoint (str): URL of an HTTP TTS endpoint; gTTS's Google
+                Translate protocol if None
+            max_concurrency (int): Upper bound on concurrent requests per host
+            initial_concurrency (int): Concurrent requests per host to start with
+            rate_limit (float): Maximum requests per second per host, or None
+            timeout (float): Seconds before a request is abandoned
+            throttle_retries (int): Attempts after a throttled response
+                before the request fails
+            max_backoff (float): Longest pause after a throttled response
+                without a Retry-After header
+            tld (str): Google Translate domain for the gTTS protocol
+        """
+        self.endpoint = endpoint
+        self.name = f"http:{endpoint}" if endpoint else "gtts"
+        # Same chunk lengths as the matching backends, for the same cache keys
+        self.chunk_chars = 2000 if endpoint else 1000
+        self.max_concurrency = max(1, max_concurrency)
+        self.initial_concurrency = initial_concurrency
+        self.rate_limit = rate_limit
+        self.timeout = timeout
+        self.throttle_retries = throttle_retries
+        self.max_backoff = max_backoff
+        self.tld = tld
+        self.requests = 0
+        self.throttled = 0
+        self.limiters = {}
+        self._session = None
+        self._loop = None
+        self._lock = threading.Lock()
+
+    def synthesize(self, text, language='en'):
+        """Synthesize text on the client's event loop and wait for the audio."""
+        return asyncio.run_coroutine_threadsafe(self.synthesize_async(text, language), self._get_loop()).result()
+
+    async def synthesize_async(self, text, language='en'):
+        """
+        Synthesize text.
+
+        Returns:
+            bytes: MP3 audio
+        """
+        if self.endpoint:
+            body = urllib.parse.urlencode({'text': text, 'lang': language})
+            return await self._post(self.endpoint, body,
+                                    {'Content-Type': 'application/x-www-form-urlencoded'})
+        from gtts import gTTS
+        tts = gTTS(text, lang=language, tld=self.tld)
+        url = f"https://translate.google.{self.tld}/_/TranslateWebserverUi/data/batchexecute"
+        responses = await asyncio.gather(
+            *(self._post(url, body, gTTS.GOOGLE_TTS_HEADERS) for body in tts.get_bodies()))
+        return b"".join(_decode_gtts_audio(response) for response in responses)
+
+    async def _post(self, url, body, headers):
+        """POST a request under its host's limit, retrying throttled attempts."""
+        host = urllib.parse.urlsplit(url).netloc
+        if host not in self.limiters:
+            self.limiters[host] = AdaptiveConcurrency(self.initial_concurrency, maximum=self.max_concurrency,
+                                                      rate_limit=self.rate_limit)
+        limiter = self.limiters[host]
+        session = self._get_session()
+        for attempt in range(self.throttle_retries + 1):
+            await limiter.acquire()
+            start_time = time.perf_counter()
+            try:
+                async with session.post(url, data=body, headers=headers) as response:
+                    self.requests += 1
+                    if response.status in (429, 503):
+                        self.throttled += 1
+                        pause = _retry_after(response.headers.get('Retry-After'))
+                        if pause is None:
+                            pause = min(self.max_backoff, 0.5 * 2 ** attempt)
+                        await limiter.release(throttled=True, pause=pause)
+                        continue
+                    if response.status >= 400:
+                        raise Exception(f"TTS endpoint returned HTTP {response.status}")
+                    audio = await response.read()
+            except BaseException:
+                await limiter.release()
+                raise
+            await limiter.release(latency=time.perf_counter() - start_time, size=len(body))
+            return audio
+        raise Exception(f"TTS requests to {host} are still throttled after {self.throttle_retries + 1} attempts")
+
+    def _get_session(self):
+        """Return the pooled session, creating it on the event loop thread."""
+        if self._session is None:
+            import aiohttp
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_concurrency * 2, keepalive_timeout=30),
+                timeout=aiohttp.ClientTimeout(total=self.timeout))
+        return self._session
+
+    def _get_loop(self):
+        """Return the client's event loop, starting its thread on first use."""
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="tts-client", daemon=True).start()
+            return self._loop
+
+    def close(self):
+        """Close the session and stop the event loop thread."""
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is None:
+            return
+        if self._session is not None:
+            asyncio.run_coroutine_threadsafe(self._session.close(), loop).result()
+            self._session = None
+        loop.call_soon_threadsafe(loop.stop)
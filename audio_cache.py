@@ -0,0 +1,286 @@
+import os
+import json
+import hashlib
+import threading
+from page_cache import DEFAULT_CACHE_DIR, SizeCap
+from audio_writer import starts_with_mp3_frame
+from chunking import ChunkIndex
+
+# Upper bound on the total size of cached audio segments
+DEFAULT_MAX_BYTES = 2 * 1024 * 1024 * 1024
+
+CHECKPOINT_VERSION = 1
+MANIFEST_VERSION = 1
+
+def chunk_key(text, language, backend):
+    """
+    Return the cache key of a synthesized chunk: a hash of the
+    whitespace-normalized text, the language and the backend name.
+    """
+    normalized = ' '.join(text.split())
+    return hashlib.sha256(f"{backend}\0{language}\0{normalized}".encode('utf-8')).hexdigest()
+
+class AudioChunkCache:
+    """
+    On-disk cache of synthesized audio chunks, one file per chunk, so a
+    conversion never pays twice for the same text. Files are evicted least
+    recently used first (by modification time, refreshed on every hit) once
+    the cache grows past its size cap.
+    """
+    def __init__(self, cache_dir=os.path.join(DEFAULT_CACHE_DIR, "audio"), max_bytes=DEFAULT_MAX_BYTES):
+        """
+        Args:
+            cache_dir (str): Directory holding the audio files
+            max_bytes (int): Size cap for the cached audio
+        """
+        os.makedirs(cache_dir, exist_ok=True)
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._size_cap = SizeCap(max_bytes)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.mp3")
+
+    def get(self, text, language, backend):
+        """Return the cached audio for a chunk, or None if it isn't cached."""
+        path = self._path(chunk_key(text, language, backend))
+        try:
+            with open(path, 'rb') as file:
+                audio = file.read()
+            os.utime(path)
+            return audio
+        except OSError:
+            return None
+
+    def put(self, text, language, backend, audio):
+        """Store the audio for a chunk, evicting old files if the cache is full."""
+        path = self._path(chunk_key(text, language, backend))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write under a temporary name so readers never see a partial file
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb') as file:
+            file.write(audio)
+        os.replace(temp_path, path)
+
+        with self._lock:
+            if self._size_cap.added(len(audio)):
+                self._evict()
+
+    def _evict(self):
+        """Delete least recently used files until the cache is under its cap."""
+        entries = []
+        for shard in os.scandir(self.cache_dir):
+            if shard.is_dir():
+                for entry in os.scandir(shard.path):
+                    if entry.name.endswith('.mp3'):
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for path in self._size_cap.victims(total, ((size, path) for _, size, path in sorted(entries))):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+class ConversionCheckpoint:
+    """
+    Append-only manifest of the chunks already written to an output file,
+    stored next to it as "<output>.checkpoint". Each line records a chunk's
+    cache key and the output size after it was written, so an interrupted
+    conversion can truncate the file to the last finished chunk and carry
+    on from there. The file is removed once the conversion completes.
+    """
+    def __init__(self, output_path, language, backend):
+        """
+        Args:
+            output_path (str): Path of the audio file being written
+            language (str): Language of the conversion
+            backend (str): Name of the synthesis backend
+        """
+        self.path = self.path_for(output_path)
+        self.output_path = output_path
+        self.header = {'version': CHECKPOINT_VERSION, 'language': language, 'backend': backend}
+        self.entries = self._load()
+        self._file = None
+
+    @staticmethod
+    def path_for(output_path):
+        return f"{output_path}.checkpoint"
+
+    def _load(self):
+        """Return the finished chunks of a previous run of the same job."""
+        if not os.path.exists(self.path) or not os.path.exists(self.output_path):
+            return []
+        entries = []
+        try:
+            with open(self.path, 'r', encoding='utf-8') as file:
+                if json.loads(file.readline()) != self.header:
+                    return []
+                for line in file:
+                    entries.append(json.loads(line))
+        except ValueError:
+            # A line cut short by a crash ends the usable part of the manifest
+            pass
+        # The output may have been rewritten since, e.g. as WAV by the
+        # offline engine; only the MP3 the entries describe can be resumed
+        if entries and not starts_with_mp3_frame(self.output_path):
+            return []
+        # Drop entries pointing past what actually reached the output file
+        output_size = os.path.getsize(self.output_path)
+        return [entry for entry in entries if entry['offset'] <= output_size]
+
+    def start(self, finished):
+        """
+        Rewrite the manifest to keep only the first `finished` entries and
+        open it for appending.
+
+        Returns:
+            int: Output file offset at which writing should resume
+        """
+        self.entries = self.entries[:finished]
+        self._file = open(self.path, 'w', encoding='utf-8')
+        self._file.write(json.dumps(self.header) + "\n")
+        for entry in self.entries:
+            self._file.write(json.dumps(entry) + "\n")
+        self._file.flush()
+        return self.entries[-1]['offset'] if self.entries else 0
+
+    def record(self, key, offset):
+        """Record a chunk whose audio has been written up to offset."""
+        entry = {'key': key, 'offset': offset}
+        self.entries.append(entry)
+        self._file.write(json.dumps(entry) + "\n")
+        self._file.flush()
+
+    def close(self, completed):
+        """Close the manifest, removing it if the conversion completed."""
+        if self._file:
+            self._file.close()
+            self._file = None
+        if completed and os.path.exists(self.path):
+            os.remove(self.path)
+
+class OutputManifest:
+    """
+    Map of a finished audio file, stored next to it as "<output>.manifest":
+    a hash of the normalized text of every page, for every chunk in file
+    order its cache key, source page and byte range in the file, and the
+    chunk index of the text (see chunking.ChunkIndex) when known. A
+    later conversion into the same file diffs against it and reuses the
+    audio of every chunk that didn't change; see PreviousOutput.
+    """
+    def __init__(self, pages=None, segments=None, chunk_index=None):
+        self.pages = pages or {}
+        self.segments = segments or []
+        self.chunk_index = chunk_index
+        self._page_digests = {}
+
+    @staticmethod
+    def path_for(output_path):
+        return f"{output_path}.manifest"
+
+    @classmethod
+    def load(cls, path):
+        """Return the manifest stored at path, or None if there is no usable one."""
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return None
+        if data.get('version') != MANIFEST_VERSION:
+            return None
+        chunk_index = ChunkIndex.from_dict(data['chunks']) if data.get('chunks') else None
+        return cls({int(page): digest for page, digest in data['pages'].items()}, data['segments'], chunk_index)
+
+    def add(self, key, text, page, start, end):
+        """Record a chunk written to bytes start..end of the output."""
+        self.segments.append({'key': key, 'page': page, 'offset': start, 'length': end - start})
+        if page is not None:
+            digest = self._page_digests.setdefault(page, hashlib.sha256())
+            digest.update(' '.join(text.split()).encode('utf-8') + b'\0')
+            self.pages[page] = digest.hexdigest()
+
+    def changed_pages(self, previous):
+        """Return the pages whose text differs from (or is missing in) a previous manifest."""
+        return sorted(page for page, digest in self.pages.items() if previous.pages.get(page) != digest)
+
+    def save(self, path):
+        data = {
+            'version': MANIFEST_VERSION,
+            'pages': {str(page): digest for page, digest in self.pages.items()},
+            'segments': self.segments,
+        }
+        if self.chunk_index is not None:
+            data['chunks'] = self.chunk_index.as_dict()
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            json.dump(data, file)
+        os.replace(temp_path, path)
+
+class PreviousOutput:
+    """
+    The audio file and manifest of an earlier conversion into the same
+    output path, moved aside as "<output>.previous" while the new file is
+    written. It works as a cache in front of another one: chunks whose key
+    appears in the old manifest are read back from the old file instead of
+    being synthesized again, so re-converting a revised PDF only
+    synthesizes the pages that changed.
+    """
+    def __init__(self, output_path, fallback=None):
+        """
+        Args:
+            output_path (str): Path of the audio file being written
+            fallback (AudioChunkCache): Cache asked for the other chunks
+        """
+        self.path = f"{output_path}.previous"
+        self.fallback = fallback
+        self.hits = 0
+        self.manifest = None
+        self._segments = {}
+        self._lock = threading.Lock()
+        if os.path.exists(self.path):
+            manifest = OutputManifest.load(OutputManifest.path_for(self.path))
+            size = os.path.getsize(self.path)
+            # Ignore a manifest that doesn't describe the file next to it
+            if manifest and all(s['offset'] + s['length'] <= size for s in manifest.segments):
+                self.manifest = manifest
+                self._segments = {segment['key']: segment for segment in manifest.segments}
+
+    @staticmethod
+    def retire(output_path):
+        """
+        Move a finished output that has a manifest aside, so its audio can
+        be reused by the conversion about to overwrite it.
+        """
+        manifest_path = OutputManifest.path_for(output_path)
+        if os.path.exists(output_path) and os.path.exists(manifest_path):
+            previous_path = f"{output_path}.previous"
+            os.replace(output_path, previous_path)
+            os.replace(manifest_path, OutputManifest.path_for(previous_path))
+
+    def get(self, text, language, backend):
+        """Return a chunk's audio from the previous output, else from the fallback cache."""
+        segment = self._segments.get(chunk_key(text, language, backend))
+        if segment:
+            try:
+                with open(self.path, 'rb') as file:
+                    file.seek(segment['offset'])
+                    audio = file.read(segment['length'])
+                if len(audio) == segment['length']:
+                    with self._lock:
+                        self.hits += 1
+                    return audio
+            except OSError:
+                pass
+        return self.fallback.get(text, language, backend) if self.fallback else None
+
+    def put(self, text, language, backend, audio):
+        if self.fallback:
+            self.fallback.put(text, language, backend, audio)
+
+    def discard(self):
+        """Delete the previous output once the new one is complete."""
+        for path in (self.path, OutputManifest.path_for(self.path)):
+            if os.path.exists(path):
+                os.remove(path)
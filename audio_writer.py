@@ -0,0 +1,184 @@
+import os
+import wave
+
+# Layer III bitrates in kbit/s by header index, for MPEG-1 and MPEG-2/2.5
+_MP3_BITRATES = {
+    3: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    2: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+# Sample rates by header index, for MPEG-1, MPEG-2 and MPEG-2.5
+_MP3_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+# Frames copied at a time when merging WAV/AIFF segments
+_FRAME_BLOCK = 65536
+
+def _id3v2_size(data, start):
+    """Return the length of an ID3v2 tag at `start`, or 0 if there is none."""
+    if data[start:start + 3] != b'ID3' or len(data) < start + 10:
+        return 0
+    size = 0
+    for byte in data[start + 6:start + 10]:
+        size = (size << 7) | (byte & 0x7f)
+    footer = 10 if data[start + 5] & 0x10 else 0
+    return 10 + size + footer
+
+def _mp3_frame_length(data, start):
+    """
+    Return the length of the MPEG Layer III frame at `start`, or None if
+    there is no such frame header there.
+    """
+    if len(data) < start + 4 or data[start] != 0xff or data[start + 1] & 0xe0 != 0xe0:
+        return None
+    version = (data[start + 1] >> 3) & 3
+    layer = (data[start + 1] >> 1) & 3
+    bitrate_index = data[start + 2] >> 4
+    rate_index = (data[start + 2] >> 2) & 3
+    if version == 1 or layer != 1 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    bitrate = _MP3_BITRATES[3 if version == 3 else 2][bitrate_index] * 1000
+    sample_rate = _MP3_SAMPLE_RATES[version][rate_index]
+    padding = (data[start + 2] >> 1) & 1
+    return (144 if version == 3 else 72) * bitrate // sample_rate + padding
+
+def mp3_frames(segment):
+    """
+    Return the audio frames of an MP3 segment without its metadata: ID3v2
+    tags at the start, an ID3v1 tag at the end and a Xing/Info/VBRI header
+    frame, which would otherwise make players take the length of the
+    first segment for the length of the whole file.
+
+    Args:
+        segment (bytes): A complete MP3 file, as returned by a TTS backend
+    Returns:
+        memoryview: The frames, without copying the segment
+    """
+    data = memoryview(segment)
+    start, end = 0, len(data)
+    while True:
+        tag_size = _id3v2_size(data, start)
+        if not tag_size:
+            break
+        start += tag_size
+    if end - start >= 128 and data[end - 128:end - 125] == b'TAG':
+        end -= 128
+
+    frame_length = _mp3_frame_length(data, start)
+    if frame_length:
+        header = bytes(data[start:start + min(frame_length, 64)])
+        if b'Xing' in header or b'Info' in header or header[36:40] == b'VBRI':
+            start += frame_length
+    return data[start:max(start, end)]
+
+def starts_with_mp3_frame(path):
+    """
+    Whether a file begins with an MPEG Layer III frame, as every file
+    written by MP3SegmentWriter does.
+    """
+    try:
+        with open(path, 'rb') as file:
+            return _mp3_frame_length(file.read(4), 0) is not None
+    except OSError:
+        return False
+
+class MP3SegmentWriter:
+    """
+    Appends MP3 segments to an output file in one sequential pass. Each
+    segment is written as soon as it arrives, with its metadata stripped
+    so the file plays as a single stream; nothing already written is kept
+    in memory or read back.
+
+        with MP3SegmentWriter(output_path) as writer:
+            for segment in segments:
+                offset = writer.append(segment)
+    """
+    def __init__(self, output_path, offset=0):
+        """
+        Args:
+            output_path (str): Path of the MP3 file to write
+            offset (int): Keep the first `offset` bytes of an existing file
+                and append after them, to resume an interrupted conversion
+        """
+        self.output_path = output_path
+        self.segments = 0
+        self._file = open(output_path, 'r+b' if offset else 'wb')
+        self._file.seek(offset)
+        self._file.truncate()
+
+    def append(self, segment):
+        """
+        Append one segment and flush it to disk.
+
+        Returns:
+            int: Size of the output file after the segment
+        """
+        self._file.write(mp3_frames(segment))
+        self._file.flush()
+        self.segments += 1
+        return self._file.tell()
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def open_frame_segment(path):
+    """Open a WAV segment (or AIFF, as pyttsx3 writes on macOS) for reading."""
+    with open(path, 'rb') as file:
+        magic = file.read(4)
+    if magic == b'RIFF':
+        return wave, wave.open(path, 'rb')
+    if magic == b'FORM':
+        try:
+            import aifc  # Deprecated in Python 3.11, removed in 3.13
+        except ImportError:
+            raise Exception("Merging AIFF audio from the offline engine requires Python 3.12 or older")
+        return aifc, aifc.open(path, 'rb')
+    raise Exception(f"Unsupported offline audio format in {os.path.basename(path)}")
+
+class FrameSegmentWriter:
+    """
+    Merges WAV or AIFF segment files into one output file of the same
+    format, copying frames in fixed-size blocks so long segments are never
+    loaded at once. The output takes its format from the first segment.
+    """
+    def __init__(self, output_path):
+        """
+        Args:
+            output_path (str): Path of the audio file to write
+        """
+        self.output_path = output_path
+        self.segments = 0
+        self._writer = None
+        self._format = None
+
+    def append_file(self, segment_path):
+        """Append the frames of a segment file."""
+        audio_format, segment = open_frame_segment(segment_path)
+        with segment:
+            params = segment.getparams()
+            if self._writer is None:
+                self._writer = audio_format.open(self.output_path, 'wb')
+                self._writer.setparams(params)
+                self._format = params[:3]
+            elif params[:3] != self._format:
+                raise Exception(f"Segment {os.path.basename(segment_path)} has a different audio format")
+            while True:
+                frames = segment.readframes(_FRAME_BLOCK)
+                if not frames:
+                    break
+                self._writer.writeframes(frames)
+        self.segments += 1
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
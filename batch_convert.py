@@ -0,0 +1,224 @@
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pdf_to_audio import PDFToAudioConverter
+from chapters import DEFAULT_PAGES_PER_PART
+from extractors import EXTRACTORS
+
+# Converter owned by the current worker process
+_converter = None
+
+def parse_page_range(value):
+    """
+    Parse a page range argument such as "10-25" or "7".
+
+    Args:
+        value (str): 1-based page range
+    Returns:
+        tuple: (start_page, end_page)
+    """
+    try:
+        start, _, end = value.partition('-')
+        page_range = (int(start), int(end or start))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid page range: {value}")
+    if not 1 <= page_range[0] <= page_range[1]:
+        raise argparse.ArgumentTypeError(f"Invalid page range: {value}")
+    return page_range
+
+def parse_chapter_numbers(value):
+    """
+    Parse a chapter selection such as "3" or "2,5,7".
+
+    Returns:
+        list: Chapter numbers
+    """
+    try:
+        numbers = [int(number) for number in value.split(',') if number.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid chapter list: {value}")
+    if not numbers or min(numbers) < 1:
+        raise argparse.ArgumentTypeError(f"Invalid chapter list: {value}")
+    return numbers
+
+def collect_pdfs(inputs, recursive=False):
+    """
+    Expand files, glob patterns and directories into a list of PDF paths.
+
+    Args:
+        inputs (list): Paths, glob patterns or directories
+        recursive (bool): Also search subdirectories of given directories
+    Returns:
+        list: Absolute PDF paths in input order, without duplicates
+    """
+    pdf_paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            pattern = os.path.join(item, "**", "*.pdf") if recursive else os.path.join(item, "*.pdf")
+            matches = sorted(glob.glob(pattern, recursive=recursive))
+        elif glob.has_magic(item):
+            matches = sorted(glob.glob(item, recursive=True))
+        else:
+            matches = [item]
+        pdf_paths.extend(os.path.abspath(path) for path in matches)
+    return list(dict.fromkeys(pdf_paths))
+
+def _init_worker(synthesis_workers, tts_endpoint, async_synthesis=False, rate_limit=None, extractor="auto"):
+    """Create the converter this worker process uses for all of its jobs."""
+    global _converter
+    # Pages are extracted and offline chunks synthesized serially inside
+    # each worker; the batch pool already keeps every core busy
+    _converter = PDFToAudioConverter(extraction_workers=1, offline_workers=1,
+                                     synthesis_workers=synthesis_workers,
+                                     tts_endpoint=tts_endpoint, async_synthesis=async_synthesis,
+                                     rate_limit=rate_limit, extractor=extractor)
+
+def _run_job(pdf_path, page_range, output_dir, engine, split=None):
+    """
+    Convert one PDF (or page range of it) in a worker process.
+
+    Args:
+        split (dict): Keyword arguments of convert_pdf_to_chapters to write
+            one file per chapter, or None for a single audio file
+
+    Returns:
+        dict: Job summary with status, output path and timings, plus the
+            conversion's profiling report under 'profile'
+    """
+    start_time = time.perf_counter()
+    summary = {
+        'pdf': pdf_path,
+        'page_range': list(page_range) if page_range else None,
+        'engine': engine,
+        'worker_pid': os.getpid(),
+        'output': None,
+        'status': 'failed',
+        'error': None,
+    }
+    try:
+        if not os.path.exists(pdf_path):
+            raise Exception("File does not exist")
+        if split is not None:
+            summary['output'] = _converter.convert_pdf_to_chapters(
+                pdf_path, output_dir=output_dir, page_range=page_range, engine=engine, **split)
+        else:
+            summary['output'] = _converter.convert_pdf_to_audiobook(
+                pdf_path, output_dir=output_dir, page_range=page_range, engine=engine)
+        if summary['output']:
+            summary['status'] = 'ok'
+        else:
+            summary['error'] = "Conversion failed"
+    except Exception as e:
+        summary['error'] = str(e)
+    summary['seconds'] = round(time.perf_counter() - start_time, 3)
+    summary['profile'] = _converter.last_profile
+    _converter.last_profile = None
+    return summary
+
+def build_parser():
+    """Return the argument parser of the batch command line."""
+    parser = argparse.ArgumentParser(
+        description="Convert PDF files to audiobooks without prompts, using a pool of worker processes.")
+    parser.add_argument('inputs', nargs='+',
+                        help="PDF files, glob patterns (quote them) or directories")
+    parser.add_argument('-p', '--pages', type=parse_page_range, action='append',
+                        help="Page range to convert, e.g. 1-50. Repeat for several ranges; default is the entire PDF")
+    parser.add_argument('-e', '--engine', choices=['auto', 'online', 'offline'], default='auto',
+                        help="TTS engine; auto tries online first and falls back to offline (default: auto)")
+    parser.add_argument('-o', '--output-dir', default="audio_output",
+                        help="Directory for the audio files (default: audio_output)")
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count() or 1,
+                        help="Number of conversion processes (default: number of CPUs)")
+    parser.add_argument('--synthesis-workers', type=int, default=4,
+                        help="Concurrent TTS requests per conversion (default: 4)")
+    parser.add_argument('--tts-endpoint',
+                        help="URL of an HTTP TTS endpoint to use instead of gTTS")
+    parser.add_argument('--async-synthesis', action='store_true',
+                        help="Use the asyncio TTS client with pooled connections and adaptive concurrency "
+                             "(requires aiohttp); --synthesis-workers becomes its upper bound")
+    parser.add_argument('--rate-limit', type=float,
+                        help="With --async-synthesis, maximum TTS requests per second per host")
+    parser.add_argument('--extractor', choices=['auto'] + list(EXTRACTORS), default='auto',
+                        help="Text extraction backend; auto calibrates the installed ones on every new PDF "
+                             "and uses the fastest that extracts usable text (default: auto)")
+    parser.add_argument('-s', '--split', action='store_true',
+                        help="Write one audio file per chapter of the PDF outline, plus a playlist and chapter index")
+    parser.add_argument('--pages-per-part', type=int, default=DEFAULT_PAGES_PER_PART,
+                        help=f"With --split, pages per file for PDFs without an outline (default: {DEFAULT_PAGES_PER_PART})")
+    parser.add_argument('--parallel-chapters', type=int, default=2,
+                        help="With --split, chapters converted at the same time per PDF (default: 2)")
+    parser.add_argument('--chapters', type=parse_chapter_numbers,
+                        help="With --split, only convert these chapters, e.g. 3,7 to redo failed ones")
+    parser.add_argument('-r', '--recursive', action='store_true',
+                        help="Search directories recursively")
+    parser.add_argument('--summary',
+                        help="Path of the JSON job summary (default: <output-dir>/batch_summary.json)")
+    parser.add_argument('--profile',
+                        help="Write per-stage timing, memory and chunk latency reports of every job to this JSON file")
+    return parser
+
+def main(argv=None):
+    """
+    Run the batch command line.
+
+    Returns:
+        int: Exit status, 0 if every job succeeded
+    """
+    args = build_parser().parse_args(argv)
+    pdf_paths = collect_pdfs(args.inputs, args.recursive)
+    if not pdf_paths:
+        print("Error: No PDF files found!")
+        return 1
+
+    split = None
+    if args.split:
+        split = {'pages_per_part': args.pages_per_part, 'parallel_chapters': args.parallel_chapters,
+                 'chapters': args.chapters}
+    page_ranges = args.pages or [None]
+    jobs = [(pdf_path, page_range) for pdf_path in pdf_paths for page_range in page_ranges]
+    os.makedirs(args.output_dir, exist_ok=True)
+    summary_path = args.summary or os.path.join(args.output_dir, "batch_summary.json")
+    print(f"Converting {len(jobs)} job(s) with {args.workers} worker(s)...")
+
+    start_time = time.perf_counter()
+    results = [None] * len(jobs)
+    profiles = [None] * len(jobs)
+    finished = 0
+    with ProcessPoolExecutor(max_workers=max(1, args.workers), initializer=_init_worker,
+                             initargs=(args.synthesis_workers, args.tts_endpoint,
+                                       args.async_synthesis, args.rate_limit, args.extractor)) as executor:
+        futures = {executor.submit(_run_job, pdf_path, page_range, args.output_dir, args.engine, split): i
+                   for i, (pdf_path, page_range) in enumerate(jobs)}
+        for future in as_completed(futures):
+            result = future.result()
+            profiles[futures[future]] = result.pop('profile')
+            results[futures[future]] = result
+            finished += 1
+            print(f"[{finished}/{len(jobs)}] {result['status']}: {result['pdf']} ({result['seconds']:.1f}s)")
+
+    failed = sum(1 for result in results if result['status'] != 'ok')
+    report = {
+        'jobs': results,
+        'total': len(results),
+        'succeeded': len(results) - failed,
+        'failed': failed,
+        'seconds': round(time.perf_counter() - start_time, 3),
+    }
+    with open(summary_path, 'w', encoding='utf-8') as file:
+        json.dump(report, file, indent=2)
+    if args.profile:
+        jobs_profiles = [{'pdf': result['pdf'], 'page_range': result['page_range'], 'profile': profile}
+                         for result, profile in zip(results, profiles)]
+        with open(args.profile, 'w', encoding='utf-8') as file:
+            json.dump({'jobs': jobs_profiles}, file, indent=2)
+        print(f"Profile written to: {args.profile}")
+
+    print(f"Done: {report['succeeded']} succeeded, {failed} failed. Summary written to: {summary_path}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+"""
+Stand-in TTS backends for benchmarks.
+
+MockTTSBackend is an in-process backend with a fixed simulated latency.
+LocalTTSServer is a local HTTP endpoint speaking the protocol of
+synthesis.HTTPTTSBackend (form fields "text" and "lang" in, audio bytes
+out), for exercising the real network path without calling Google.
+"""
+import time
+import random
+import threading
+from urllib.parse import parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Roughly what an MP3 at gTTS's bitrate takes per character of text
+BYTES_PER_CHAR = 60
+
+def fake_audio(text):
+    """Return deterministic stand-in audio bytes sized like real speech."""
+    return b"\xff\xf3" * (len(text) * BYTES_PER_CHAR // 2)
+
+class MockTTSBackend:
+    """In-process TTS backend that sleeps instead of calling a service."""
+    name = "mock"
+
+    def __init__(self, latency=0.05):
+        """
+        Args:
+            latency (float): Simulated seconds per request
+        """
+        self.latency = latency
+
+    def synthesize(self, text, language='en'):
+        time.sleep(self.latency)
+        return fake_audio(text)
+
+class LocalTTSServer:
+    """
+    Local stand-in TTS HTTP server, used as a context manager:
+
+        with LocalTTSServer(latency=0.02) as server:
+            backend = HTTPTTSBackend(server.url)
+    """
+    def __init__(self, latency=0.05, failure_rate=0.0, throttle_above=None):
+        """
+        Args:
+            latency (float): Simulated seconds per request
+            failure_rate (float): Share of requests answered with HTTP 500
+            throttle_above (int): Answer HTTP 429 while more than this many
+                requests are in progress; no throttling if None
+        """
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.throttle_above = throttle_above
+        self.requests = 0
+        self.throttled = 0
+        self._active = 0
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._server.server_port}/tts"
+
+    def __enter__(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                fields = parse_qs(self.rfile.read(length).decode('utf-8'))
+                with server._lock:
+                    server.requests += 1
+                    server._active += 1
+                    throttled = server.throttle_above is not None and server._active > server.throttle_above
+                    server.throttled += throttled
+                try:
+                    if throttled:
+                        self._reply(429, b"", {'Retry-After': '1'})
+                    elif random.random() < server.failure_rate:
+                        self._reply(500, b"")
+                    else:
+                        time.sleep(server.latency)
+                        self._reply(200, fake_audio(fields.get('text', [''])[0]))
+                finally:
+                    with server._lock:
+                        server._active -= 1
+
+            def _reply(self, status, body, headers=None):
+                self.send_response(status)
+                self.send_header('Content-Type', 'audio/mpeg')
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,191 @@
+"""
+Benchmark the conversion pipeline stage by stage and end to end.
+
+A synthetic PDF is generated, then extraction, preprocessing, language
+detection and synthesis are timed on their own, followed by a full
+convert_pdf_to_audiobook run. Synthesis uses a mock backend (or, with
+--tts http, a local stand-in HTTP endpoint), so results don't depend on
+Google's service. Every run starts from empty page and audio caches.
+
+Results are written as JSON. Given a baseline report, the run fails if the
+throughput of any stage dropped by more than --max-regression.
+
+Usage:
+    python benchmarks/pipeline.py --pages 200 --json report.json
+    python benchmarks/pipeline.py --pages 200 --baseline report.json --max-regression 0.15
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import platform
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pdf_to_audio import PDFToAudioConverter
+from page_cache import PageTextCache
+from audio_cache import AudioChunkCache
+from synthesis import HTTPTTSBackend
+from async_synthesis import AsyncTTSClient
+from extractors import EXTRACTORS, DEFAULT_EXTRACTOR
+from synthetic_pdf import write_synthetic_pdf
+from mock_tts import MockTTSBackend, LocalTTSServer
+
+def timed(function, *args, **kwargs):
+    """Run a function and return (result, wall seconds, CPU seconds)."""
+    wall, cpu = time.perf_counter(), time.process_time()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - wall, time.process_time() - cpu
+
+def stage_result(wall, cpu, pages=None, chars=None, chunks=None):
+    """Build the report entry of a stage. `throughput` is what regressions are checked on."""
+    result = {'seconds': round(wall, 4), 'cpu_seconds': round(cpu, 4)}
+    if pages is not None:
+        result['pages_per_second'] = pages / wall if wall else 0.0
+    if chars is not None:
+        result['chars_per_second'] = chars / wall if wall else 0.0
+    if chunks is not None:
+        result['chunks_per_second'] = chunks / wall if wall else 0.0
+    result['throughput'] = result.get('chunks_per_second', result.get('chars_per_second', 0.0))
+    return result
+
+def make_converter(work_dir, backend, args):
+    """Return a converter with empty caches under work_dir and the given TTS backend."""
+    converter = PDFToAudioConverter(
+        extraction_workers=args.extraction_workers,
+        synthesis_workers=args.synthesis_workers,
+        extractor=args.extractor,
+        page_cache=PageTextCache(tempfile.mkdtemp(dir=work_dir)),
+        audio_cache=AudioChunkCache(tempfile.mkdtemp(dir=work_dir)),
+    )
+    converter.synthesis_engine.backend = backend
+    if isinstance(backend, AsyncTTSClient):
+        # The client decides how many requests actually run at once
+        converter.synthesis_engine.workers = backend.max_concurrency
+    return converter
+
+def run_benchmarks(args, work_dir, backend):
+    """Time every stage and return the report's stage results."""
+    pdf_path = os.path.join(work_dir, "synthetic.pdf")
+    write_synthetic_pdf(pdf_path, args.pages, args.words_per_page, seed=args.seed)
+    stages = {}
+
+    converter = make_converter(work_dir, backend, args)
+    text, wall, cpu = timed(converter.extract_text_from_pdf, pdf_path)
+    stages['extraction'] = stage_result(wall, cpu, pages=args.pages, chars=len(text))
+
+    # Same call again, now served from the page cache
+    _, wall, cpu = timed(converter.extract_text_from_pdf, pdf_path)
+    stages['extraction_cached'] = stage_result(wall, cpu, pages=args.pages, chars=len(text))
+
+    processed_text, wall, cpu = timed(converter.preprocess_text, text)
+    stages['preprocessing'] = stage_result(wall, cpu, chars=len(text))
+
+    sentences, wall, cpu = timed(lambda: list(converter.iter_sentences(converter.iter_page_texts(pdf_path))))
+    stages['cleaning_stream'] = stage_result(wall, cpu, pages=args.pages, chars=len(text))
+
+    language, wall, cpu = timed(converter.detect_language, processed_text)
+    stages['detection'] = stage_result(wall, cpu, chars=len(processed_text))
+
+    output_path = os.path.join(work_dir, "synthesis.mp3")
+    _, wall, cpu = timed(converter.convert_to_audio, processed_text, output_path, language)
+    stats = converter.synthesis_engine.last_stats
+    stages['synthesis'] = stage_result(wall, cpu, chars=len(processed_text), chunks=stats['chunks'])
+
+    converter = make_converter(work_dir, backend, args)
+    output_dir = os.path.join(work_dir, "audio_output")
+    _, wall, cpu = timed(converter.convert_pdf_to_audiobook, pdf_path, output_dir, None, args.engine)
+    stats = converter.synthesis_engine.last_stats
+    stages['end_to_end'] = stage_result(wall, cpu, pages=args.pages, chars=len(text), chunks=stats['chunks'])
+    return stages
+
+def check_regressions(stages, baseline, max_regression):
+    """
+    Compare stage throughput against a baseline report.
+
+    Returns:
+        list: Descriptions of the stages that regressed
+    """
+    regressions = []
+    for name, result in stages.items():
+        previous = baseline.get('stages', {}).get(name, {}).get('throughput')
+        if previous and result['throughput'] < previous * (1 - max_regression):
+            drop = 1 - result['throughput'] / previous
+            regressions.append(f"{name}: throughput {result['throughput']:.1f}/s vs "
+                               f"{previous:.1f}/s baseline ({drop:.0%} slower)")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the PDF to audiobook pipeline.")
+    parser.add_argument('--pages', type=int, default=100, help="Pages in the synthetic PDF (default: 100)")
+    parser.add_argument('--words-per-page', type=int, default=350, help="Body words per page (default: 350)")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed of the synthetic text (default: 0)")
+    parser.add_argument('--tts', choices=['mock', 'http'], default='mock',
+                        help="Mock in-process backend or local stand-in HTTP endpoint (default: mock)")
+    parser.add_argument('--latency', type=float, default=0.05,
+                        help="Simulated seconds per TTS request (default: 0.05)")
+    parser.add_argument('--async-client', action='store_true',
+                        help="With --tts http, use the asyncio client instead of HTTPTTSBackend")
+    parser.add_argument('--throttle-above', type=int,
+                        help="With --tts http, have the server answer HTTP 429 above this many concurrent requests")
+    parser.add_argument('--engine', choices=['online', 'auto'], default='online',
+                        help="Engine for the end-to-end run (default: online)")
+    parser.add_argument('--extraction-workers', type=int, help="Extraction processes (default: number of CPUs)")
+    parser.add_argument('--extractor', choices=['auto'] + list(EXTRACTORS), default=DEFAULT_EXTRACTOR,
+                        help=f"Text extraction backend (default: {DEFAULT_EXTRACTOR})")
+    parser.add_argument('--synthesis-workers', type=int, default=4, help="Concurrent TTS requests (default: 4)")
+    parser.add_argument('--json', help="Write the report to this JSON file")
+    parser.add_argument('--baseline', help="Baseline report to check for regressions")
+    parser.add_argument('--max-regression', type=float, default=0.2,
+                        help="Allowed throughput drop against the baseline (default: 0.2)")
+    args = parser.parse_args(argv)
+
+    work_dir = tempfile.mkdtemp(prefix="pdf_audiobook_bench_")
+    try:
+        if args.tts == 'http':
+            with LocalTTSServer(latency=args.latency, throttle_above=args.throttle_above) as server:
+                if args.async_client:
+                    backend = AsyncTTSClient(server.url, max_concurrency=args.synthesis_workers)
+                else:
+                    backend = HTTPTTSBackend(server.url)
+                try:
+                    stages = run_benchmarks(args, work_dir, backend)
+                finally:
+                    if args.async_client:
+                        backend.close()
+                print(f"TTS server: {server.requests} requests, {server.throttled} throttled")
+        else:
+            stages = run_benchmarks(args, work_dir, MockTTSBackend(latency=args.latency))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        'config': {key: value for key, value in vars(args).items() if key not in ('json', 'baseline')},
+        'environment': {'python': platform.python_version(), 'platform': platform.platform(),
+                        'cpus': os.cpu_count()},
+        'stages': stages,
+    }
+
+    print(f"\n{'stage':18} {'seconds':>9} {'throughput':>14}")
+    for name, result in stages.items():
+        print(f"{name:18} {result['seconds']:9.3f} {result['throughput']:14.1f}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as file:
+            regressions = check_regressions(stages, json.load(file), args.max_regression)
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        if regressions:
+            return 1
+        print("No throughput regressions against the baseline.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
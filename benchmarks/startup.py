@@ -0,0 +1,107 @@
+"""
+Measure cold-start time of the CLI, the GUI and batch workers.
+
+Every scenario runs in a fresh interpreter, so module imports are not
+shared between runs. The "eager_backends" scenario loads every TTS,
+tokenizer and language backend up front, the way the converter used to at
+import time, as the reference the lazy scenarios are compared against.
+
+Usage:
+    python benchmarks/startup.py [--runs 5] [--json report.json]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Code timed inside the child interpreter for each scenario
+SCENARIOS = {
+    'cli': (
+        "import pdf_to_audio\n"
+        "pdf_to_audio.PDFToAudioConverter()\n"
+    ),
+    'batch_worker': (
+        "import batch_convert\n"
+        "batch_convert._init_worker(4, None)\n"
+    ),
+    'gui_import': (
+        "import pdf_audiobook_gui\n"
+    ),
+    'eager_backends': (
+        "import pdf_to_audio, gtts, pyttsx3, langdetect, nltk, tqdm\n"
+        "nltk.data.find('tokenizers/punkt')\n"
+        "pyttsx3.init()\n"
+        "langdetect.detect_langs('warm up the language profiles')\n"
+    ),
+}
+
+_TIMER = (
+    "import time\n"
+    "_start = time.perf_counter()\n"
+    "{code}"
+    "print(time.perf_counter() - _start)\n"
+)
+
+def time_scenario(code, runs):
+    """
+    Run a scenario in fresh interpreters.
+
+    Returns:
+        dict: Median and minimum seconds spent in the scenario code and in
+            the whole process, or the error of the first failed run
+    """
+    inner, total = [], []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, "-c", _TIMER.format(code=code)], cwd=REPO_ROOT,
+                                capture_output=True, text=True)
+        elapsed = time.perf_counter() - start
+        if result.returncode != 0:
+            return {'error': result.stderr.strip().splitlines()[-1]}
+        inner.append(float(result.stdout.strip().splitlines()[-1]))
+        total.append(elapsed)
+    return {
+        'median_seconds': statistics.median(inner),
+        'min_seconds': min(inner),
+        'median_process_seconds': statistics.median(total),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure cold-start time of the app's entry points.")
+    parser.add_argument('--runs', type=int, default=5, help="Runs per scenario (default: 5)")
+    parser.add_argument('--json', help="Write the results to this JSON file")
+    parser.add_argument('scenarios', nargs='*',
+                        help=f"Scenarios to run: {', '.join(SCENARIOS)} (default: all)")
+    args = parser.parse_args(argv)
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(sorted(unknown))}")
+
+    results = {}
+    for name in args.scenarios or SCENARIOS:
+        results[name] = time_scenario(SCENARIOS[name], args.runs)
+        if 'error' in results[name]:
+            print(f"{name:16} failed: {results[name]['error']}")
+        else:
+            print(f"{name:16} {results[name]['median_seconds'] * 1000:8.1f} ms "
+                  f"(process {results[name]['median_process_seconds'] * 1000:.1f} ms)")
+
+    reference = results.get('eager_backends', {}).get('median_seconds')
+    if reference:
+        for name, result in results.items():
+            if name != 'eager_backends' and 'median_seconds' in result:
+                result['fraction_of_eager'] = result['median_seconds'] / reference
+                print(f"{name:16} {result['fraction_of_eager']:.0%} of eager startup")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
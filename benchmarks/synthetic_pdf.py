@@ -0,0 +1,149 @@
+"""
+Generate synthetic PDFs for benchmarks.
+
+The PDFs are written directly, without any PDF library: each page holds a
+running header, a page number footer and pseudo-English body text, and
+chapters can be added to the document outline. Output is deterministic for
+a given seed.
+
+Usage:
+    python benchmarks/synthetic_pdf.py out.pdf --pages 200 --words-per-page 400
+"""
+import sys
+import random
+import argparse
+
+_VOCABULARY = (
+    "the of and to in is was that for it with as his on be at by this had not are but from or have "
+    "an they which one you were her all she there would their we him been has when who will more no "
+    "if out so said what up its about into than them can only other new some could time these two may "
+    "then do first any my now such like our over man me even most made after also did many before must "
+    "through back years where much your way well down should because each just those people how too "
+    "little state good very make world still own see men work long get here between both life being "
+    "under never day same another know while last might us great old year off come since against go "
+    "came right used take three system house number chapter reader story water light river city"
+).split()
+
+def _sentences(rng):
+    """Yield pseudo-English sentences forever."""
+    while True:
+        words = [rng.choice(_VOCABULARY) for _ in range(rng.randint(8, 20))]
+        yield ' '.join(words).capitalize() + '.'
+
+def _escape(text):
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+def _wrap(words, width):
+    """Break a list of words into lines of at most width characters."""
+    lines, line = [], ""
+    for word in words:
+        if line and len(line) + 1 + len(word) > width:
+            lines.append(line)
+            line = word
+        else:
+            line = f"{line} {word}" if line else word
+    if line:
+        lines.append(line)
+    return lines
+
+def write_synthetic_pdf(path, pages=50, words_per_page=350, chapter_every=None, seed=0,
+                        title="Synthetic Benchmark Book"):
+    """
+    Write a text PDF of the given size.
+
+    Args:
+        path (str): Output path
+        pages (int): Number of pages
+        words_per_page (int): Density of the body text
+        chapter_every (int): Start a new outline chapter every this many
+            pages; no outline if None
+        seed (int): Random seed for the body text
+        title (str): Running header printed on every page
+    Returns:
+        int: Number of body characters written
+    """
+    rng = random.Random(seed)
+    sentences = _sentences(rng)
+    chapters = list(range(0, pages, chapter_every)) if chapter_every else []
+
+    # Object ids: 1 catalog, 2 page tree, 3 font, 4 outline root, then a
+    # page and a content stream per page, then one outline item per chapter
+    page_id = lambda i: 5 + 2 * i
+    content_id = lambda i: 6 + 2 * i
+    item_id = lambda i: 5 + 2 * pages + i
+    objects = {}
+
+    catalog = "<< /Type /Catalog /Pages 2 0 R"
+    if chapters:
+        catalog += " /Outlines 4 0 R /PageMode /UseOutlines"
+    objects[1] = catalog + " >>"
+    kids = ' '.join(f"{page_id(i)} 0 R" for i in range(pages))
+    objects[2] = f"<< /Type /Pages /Kids [{kids}] /Count {pages} >>"
+    objects[3] = "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"
+
+    total_chars = 0
+    for i in range(pages):
+        words = []
+        while len(words) < words_per_page:
+            words.extend(next(sentences).split())
+        lines = _wrap(words[:words_per_page], 95)
+        total_chars += sum(len(line) + 1 for line in lines)
+
+        content = [f"BT /F1 9 Tf 11 TL 40 780 Td ({_escape(title)}) Tj T* T*"]
+        if i in chapters:
+            content.append(f"(Chapter {chapters.index(i) + 1}) Tj T* T*")
+        content.extend(f"({_escape(line)}) Tj T*" for line in lines)
+        content.append(f"ET BT /F1 9 Tf 290 30 Td ({i + 1}) Tj ET")
+        stream = '\n'.join(content).encode('latin-1')
+        objects[page_id(i)] = (f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 800] "
+                               f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_id(i)} 0 R >>")
+        objects[content_id(i)] = (f"<< /Length {len(stream)} >>\nstream\n".encode('latin-1')
+                                  + stream + b"\nendstream")
+
+    if chapters:
+        objects[4] = (f"<< /Type /Outlines /First {item_id(0)} 0 R "
+                      f"/Last {item_id(len(chapters) - 1)} 0 R /Count {len(chapters)} >>")
+        for n, start in enumerate(chapters):
+            links = ""
+            if n > 0:
+                links += f" /Prev {item_id(n - 1)} 0 R"
+            if n < len(chapters) - 1:
+                links += f" /Next {item_id(n + 1)} 0 R"
+            objects[item_id(n)] = (f"<< /Title (Chapter {n + 1}) /Parent 4 0 R "
+                                   f"/Dest [{page_id(start)} 0 R /Fit]{links} >>")
+    else:
+        objects[4] = "<< /Type /Outlines /Count 0 >>"
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = {}
+    for obj_id in sorted(objects):
+        body = objects[obj_id]
+        offsets[obj_id] = len(out)
+        out += f"{obj_id} 0 obj\n".encode('latin-1')
+        out += body if isinstance(body, bytes) else body.encode('latin-1')
+        out += b"\nendobj\n"
+    xref_offset = len(out)
+    size = max(objects) + 1
+    out += f"xref\n0 {size}\n0000000000 65535 f \n".encode('latin-1')
+    for obj_id in range(1, size):
+        out += f"{offsets[obj_id]:010d} 00000 n \n".encode('latin-1')
+    out += f"trailer\n<< /Size {size} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode('latin-1')
+
+    with open(path, 'wb') as file:
+        file.write(out)
+    return total_chars
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a synthetic text PDF for benchmarks.")
+    parser.add_argument('path', help="Output PDF path")
+    parser.add_argument('--pages', type=int, default=50, help="Number of pages (default: 50)")
+    parser.add_argument('--words-per-page', type=int, default=350, help="Body words per page (default: 350)")
+    parser.add_argument('--chapter-every', type=int, help="Add an outline chapter every N pages")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed (default: 0)")
+    args = parser.parse_args(argv)
+    chars = write_synthetic_pdf(args.path, args.pages, args.words_per_page, args.chapter_every, args.seed)
+    print(f"Wrote {args.pages} pages ({chars} characters) to {args.path}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+import os
+import re
+import json
+import PyPDF2
+
+# Part length used when a PDF has no outline to split on
+DEFAULT_PAGES_PER_PART = 20
+
+# Characters that can't appear in file names on common file systems
+_UNSAFE_FILENAME = re.compile(r'[\\/:*?"<>|\x00-\x1f]+')
+
+def read_outline(pdf_path):
+    """
+    Read the top-level entries of a PDF's outline (bookmarks).
+
+    Args:
+        pdf_path (str): Path to the PDF file
+    Returns:
+        list: (title, start_page) tuples with 1-based pages, in page order;
+            empty if the PDF has no usable outline
+    """
+    reader = PyPDF2.PdfReader(pdf_path)
+    try:
+        outline = reader.outline
+    except Exception:
+        return []
+    entries = []
+    for item in outline:
+        # Nested lists hold the sections of the entry before them
+        if isinstance(item, list):
+            continue
+        try:
+            page_index = reader.get_destination_page_number(item)
+        except Exception:
+            continue
+        if page_index is None or page_index < 0:
+            continue
+        entries.append((' '.join(str(item.title).split()), page_index + 1))
+    entries.sort(key=lambda entry: entry[1])
+    return entries
+
+def plan_chapters(outline, total_pages, page_range=None, pages_per_part=DEFAULT_PAGES_PER_PART):
+    """
+    Split a page range into chapters at the outline entries, or into parts
+    of `pages_per_part` pages if no outline entry falls inside the range.
+
+    Args:
+        outline (list): (title, start_page) tuples from read_outline
+        total_pages (int): Number of pages in the PDF
+        page_range (tuple): Optional (start_page, end_page), 1-based
+        pages_per_part (int): Pages per part without an outline
+    Returns:
+        list: Chapter dicts with 'number', 'title', 'start_page' and
+            'end_page', covering the range without gaps
+    """
+    first, last = page_range or (1, total_pages)
+    starts = {}
+    covering = None
+    for title, page in outline:
+        if page < first:
+            covering = title
+        elif page <= last:
+            # Several entries on one page become a single chapter
+            starts.setdefault(page, title or f"Page {page}")
+
+    if starts:
+        if first not in starts:
+            # The range starts inside a chapter, or before the first one
+            starts[first] = covering or "Front matter"
+    else:
+        step = max(1, pages_per_part)
+        for page in range(first, last + 1, step):
+            starts[page] = f"Pages {page}-{min(page + step - 1, last)}"
+
+    pages = sorted(starts)
+    return [{'number': n + 1,
+             'title': starts[page],
+             'start_page': page,
+             'end_page': pages[n + 1] - 1 if n + 1 < len(pages) else last}
+            for n, page in enumerate(pages)]
+
+def chapter_filename(chapter, chapter_count, extension=".mp3"):
+    """
+    Return the audio file name of a chapter, e.g. "03 - The River.mp3".
+    Numbers are zero-padded so the files sort in reading order.
+    """
+    title = _UNSAFE_FILENAME.sub('_', chapter['title']).strip(' .')[:80]
+    number = str(chapter['number']).zfill(max(2, len(str(chapter_count))))
+    return f"{number} - {title}{extension}" if title else f"{number}{extension}"
+
+def load_chapter_index(index_path):
+    """
+    Load the chapters of a chapter index written by write_chapter_index.
+
+    Returns:
+        list: Chapter dicts, empty if the index doesn't exist or can't be read
+    """
+    try:
+        with open(index_path, 'r', encoding='utf-8') as file:
+            return json.load(file).get('chapters', [])
+    except (OSError, ValueError):
+        return []
+
+def write_chapter_index(index_path, pdf_path, chapters):
+    """
+    Write the chapter index: every chapter's title, pages, audio file and
+    conversion status. The file is replaced atomically, so it can be read
+    while chapters are still being converted.
+    """
+    index = {'pdf': os.path.abspath(pdf_path), 'chapters': chapters}
+    temp_path = index_path + ".tmp"
+    with open(temp_path, 'w', encoding='utf-8') as file:
+        json.dump(index, file, indent=2)
+    os.replace(temp_path, index_path)
+
+def write_playlist(playlist_path, chapters):
+    """
+    Write an extended M3U playlist of the converted chapters in reading
+    order, with paths relative to the playlist.
+    """
+    with open(playlist_path, 'w', encoding='utf-8') as file:
+        file.write("#EXTM3U\n")
+        for chapter in chapters:
+            if chapter['status'] == 'ok':
+                file.write(f"#EXTINF:-1,{chapter['title']}\n{chapter['file']}\n")
@@ -0,0 +1,166 @@
+import re
+from array import array
+from text_cleaning import sent_tokenize
+
+# Chunk length for TTS backends that don't declare their own chunk_chars
+DEFAULT_CHUNK_CHARS = 2000
+
+# Places an overlong sentence can be broken at: after a clause
+_CLAUSE_BREAK = re.compile(r'[,;:)—]\s')
+
+def chunk_limit(backend):
+    """
+    Return the chunk length a TTS backend works best with: its
+    `chunk_chars` attribute, or DEFAULT_CHUNK_CHARS.
+    """
+    return getattr(backend, 'chunk_chars', None) or DEFAULT_CHUNK_CHARS
+
+def split_long_sentence(sentence, max_chars):
+    """
+    Break a sentence longer than max_chars into pieces that fit, after a
+    clause where one ends in the second half of the piece, otherwise
+    between words. Text extracted from tables and lists often has no
+    sentence ends at all for pages on end.
+
+    Yields:
+        str: Pieces of at most max_chars characters
+    """
+    while len(sentence) > max_chars:
+        window = sentence[:max_chars + 1]
+        cut = max((match.end() for match in _CLAUSE_BREAK.finditer(window)), default=0)
+        if cut < max_chars // 2:
+            cut = window.rfind(' ')
+            if cut <= 0:
+                cut = max_chars
+        yield sentence[:cut].rstrip()
+        sentence = sentence[cut:].lstrip()
+    if sentence:
+        yield sentence
+
+def pack_sentences(sentences, max_chars=DEFAULT_CHUNK_CHARS):
+    """
+    Pack sentences into chunks of at most max_chars characters, splitting
+    only between sentences, except for a single sentence longer than
+    max_chars (see split_long_sentence).
+
+    Args:
+        sentences: Iterable of sentence strings
+        max_chars (int): Maximum chunk length
+    Yields:
+        str: Chunks of text ready for synthesis
+    """
+    chunk = []
+    chunk_len = 0
+    for sentence in sentences:
+        for piece in split_long_sentence(sentence, max_chars):
+            if chunk and chunk_len + 1 + len(piece) > max_chars:
+                yield ' '.join(chunk)
+                chunk = []
+                chunk_len = 0
+            chunk_len += len(piece) + (1 if chunk else 0)
+            chunk.append(piece)
+    if chunk:
+        yield ' '.join(chunk)
+
+class PageChunk(str):
+    """
+    A chunk of text that remembers the (0-based) page it comes from, or
+    None, and its character offset in the text of the whole conversion.
+    """
+    def __new__(cls, text, page, offset=0):
+        chunk = super().__new__(cls, text)
+        chunk.page = page
+        chunk.offset = offset
+        return chunk
+
+    def __reduce__(self):
+        return PageChunk, (str(self), self.page, self.offset)
+
+class ChunkIndex:
+    """
+    Compact record of how a text was cut into chunks: for every chunk in
+    order, its character offset in the text, its source page (0-based) and
+    its length. Stored as three integer arrays, so even a long book's
+    index takes a few hundred kilobytes. Chunk n is the nth audio segment
+    of the output, so the index maps a page or text position to the audio
+    that speaks it.
+    """
+    def __init__(self, offsets=(), pages=(), chars=()):
+        self.offsets = array('q', offsets)
+        self.pages = array('l', pages)
+        self.chars = array('l', chars)
+
+    def add(self, offset, page, chars):
+        self.offsets.append(offset)
+        self.pages.append(-1 if page is None else page)
+        self.chars.append(chars)
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, number):
+        """Return (offset, page, chars) of a chunk; page is None if unknown."""
+        page = self.pages[number]
+        return self.offsets[number], (None if page < 0 else page), self.chars[number]
+
+    @property
+    def total_chars(self):
+        return sum(self.chars)
+
+    def as_dict(self):
+        return {'offsets': list(self.offsets), 'pages': list(self.pages), 'chars': list(self.chars)}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['offsets'], data['pages'], data['chars'])
+
+class TextChunker:
+    """
+    Chunking stage of the pipeline. Packs sentences into chunks of up to
+    max_chars characters, the length the synthesis backend handles best
+    (see chunk_limit), and records every chunk it hands out in `index`.
+
+    A chunker numbers its chunks through one text, so use a new one for
+    every conversion.
+    """
+    def __init__(self, max_chars=DEFAULT_CHUNK_CHARS):
+        """
+        Args:
+            max_chars (int): Maximum chunk length
+        """
+        self.max_chars = max_chars
+        self.index = ChunkIndex()
+        self._offset = 0
+
+    def chunk_pages(self, page_sentences):
+        """
+        Pack each page's sentences into chunks separately, so no chunk
+        spans two pages. A page's chunks then depend on nothing but its own
+        text, and an unchanged page of a revised PDF yields exactly the
+        same chunks.
+
+        Args:
+            page_sentences: Iterable of (page_num, sentences) tuples
+        Yields:
+            PageChunk: Chunks of text ready for synthesis
+        """
+        for page_num, sentences in page_sentences:
+            for text in pack_sentences(sentences, self.max_chars):
+                yield self._add(text, page_num)
+
+    def chunk_text(self, text):
+        """
+        Chunk a whole text, split into sentences with nltk.
+
+        Yields:
+            PageChunk: Chunks of text ready for synthesis, without a page
+        """
+        for chunk in pack_sentences(sent_tokenize(' '.join(text.split())), self.max_chars):
+            yield self._add(chunk, None)
+
+    def _add(self, text, page):
+        chunk = PageChunk(text, page, self._offset)
+        self.index.add(self._offset, page, len(text))
+        # Chunks are read as if joined by single spaces
+        self._offset += len(text) + 1
+        return chunk
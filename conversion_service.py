@@ -0,0 +1,362 @@
+"""
+Long-running conversion service.
+
+A local HTTP server keeps a pool of worker processes with warm converters
+and runs uploaded PDFs through a priority queue. Jobs are identified by the
+content hash of the PDF together with the page range and output options,
+so an identical document uploaded twice, by anyone, is converted once and
+every request shares the result.
+
+Usage:
+    python conversion_service.py --port 8765 --workers 2
+
+    curl --data-binary @book.pdf "http://127.0.0.1:8765/jobs?pages=1-50&priority=5"
+    curl http://127.0.0.1:8765/jobs/<id>
+    curl -o book.mp3 http://127.0.0.1:8765/jobs/<id>/audio
+    curl -o part.mp3 http://127.0.0.1:8765/jobs/<id>/files/<name>
+
+The audio of a split job is its chapter index (chapters.json); the
+chapter files and playlist it names are served under files/.
+"""
+import os
+import sys
+import json
+import time
+import queue
+import hashlib
+import mimetypes
+import argparse
+import tempfile
+import threading
+from urllib.parse import urlsplit, parse_qs, unquote
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from page_cache import DEFAULT_CACHE_DIR
+from batch_convert import parse_page_range, _init_worker, _run_job
+
+DEFAULT_SERVICE_DIR = os.path.join(DEFAULT_CACHE_DIR, "service")
+
+# Largest PDF accepted in one upload
+MAX_UPLOAD_BYTES = 512 * 1024 * 1024
+
+class ConversionService:
+    """
+    Job queue and worker pool behind the HTTP interface.
+
+    Jobs wait in a priority queue (higher priority first, then submission
+    order) and at most `workers` of them run at once, each in a worker
+    process that keeps its converter, caches and loaded libraries between
+    jobs. Submitting a job that already exists returns the existing one; a
+    higher priority moves it up the queue. Failed jobs run again when they
+    are submitted again.
+    """
+    def __init__(self, service_dir=DEFAULT_SERVICE_DIR, workers=2, synthesis_workers=4,
+                 tts_endpoint=None, async_synthesis=False):
+        """
+        Args:
+            service_dir (str): Directory for uploaded PDFs and audio output
+            workers (int): Number of conversions running at the same time
+            synthesis_workers (int): Concurrent TTS requests per conversion
+            tts_endpoint (str): Optional URL of an HTTP TTS endpoint
+            async_synthesis (bool): Use the asyncio TTS client
+        """
+        self.upload_dir = os.path.join(service_dir, "uploads")
+        self.output_dir = os.path.join(service_dir, "output")
+        os.makedirs(self.upload_dir, exist_ok=True)
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.workers = max(1, workers)
+        self.jobs = {}
+        self._queue = queue.PriorityQueue()
+        self._sequence = 0
+        self._slots = threading.Semaphore(self.workers)
+        self._lock = threading.Lock()
+        self._worker_args = (synthesis_workers, tts_endpoint, async_synthesis)
+        self._executor = self._new_executor()
+        self._dispatcher = threading.Thread(target=self._dispatch, name="job-dispatcher", daemon=True)
+        self._dispatcher.start()
+
+    def store_upload(self, stream, length):
+        """
+        Save an uploaded PDF under its content hash, reading it in blocks.
+
+        Returns:
+            tuple: (sha256 hex digest, path of the stored PDF)
+        """
+        digest = hashlib.sha256()
+        handle, temp_path = tempfile.mkstemp(dir=self.upload_dir, suffix=".part")
+        try:
+            with os.fdopen(handle, 'wb') as file:
+                remaining = length
+                while remaining:
+                    block = stream.read(min(remaining, 1024 * 1024))
+                    if not block:
+                        raise Exception("Upload ended early")
+                    digest.update(block)
+                    file.write(block)
+                    remaining -= len(block)
+            pdf_path = os.path.join(self.upload_dir, f"{digest.hexdigest()}.pdf")
+            os.replace(temp_path, pdf_path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+        return digest.hexdigest(), pdf_path
+
+    def submit(self, doc_hash, pdf_path, page_range=None, engine="auto", split=False, priority=0):
+        """
+        Queue a conversion, or return the existing job for the same
+        document, page range and options.
+
+        Returns:
+            tuple: (job dict, True if an existing job was reused)
+        """
+        key = f"{doc_hash}:{page_range}:{engine}:{split}"
+        job_id = hashlib.sha256(key.encode('utf-8')).hexdigest()[:16]
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job and job['status'] != 'failed':
+                job['requests'] += 1
+                if job['status'] == 'queued' and priority > job['priority']:
+                    job['priority'] = priority
+                    self._enqueue(job)
+                return self._public(job), True
+
+            job = {
+                'id': job_id,
+                'document': doc_hash,
+                'pdf_path': pdf_path,
+                'page_range': list(page_range) if page_range else None,
+                'engine': engine,
+                'split': split,
+                'priority': priority,
+                'status': 'queued',
+                'requests': (job['requests'] + 1) if job else 1,
+                'submitted': time.time(),
+                'started': None,
+                'finished': None,
+                'output': None,
+                'error': None,
+            }
+            self.jobs[job_id] = job
+            self._enqueue(job)
+            return self._public(job), False
+
+    def status(self, job_id):
+        """Return a job's public status, or None for an unknown id."""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            return self._public(job) if job else None
+
+    def list_jobs(self):
+        with self._lock:
+            return [self._public(job) for job in self.jobs.values()]
+
+    def output_path(self, job_id):
+        """Return the output file of a finished job, or None."""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            return job['output'] if job and job['status'] == 'done' else None
+
+    def output_file(self, job_id, name):
+        """
+        Return a file written by a finished job, such as a chapter of a
+        split job, or None. Only plain file names in the job's own output
+        directory are served.
+        """
+        output = self.output_path(job_id)
+        if not output or name in ('', '.', '..') or os.path.basename(name) != name:
+            return None
+        path = os.path.join(os.path.dirname(output), name)
+        return path if os.path.isfile(path) else None
+
+    def _public(self, job):
+        """Job fields shown to clients, with the queue position of a queued job."""
+        # Paths on the server are nobody else's business
+        public = {key: value for key, value in job.items() if key not in ('pdf_path', 'output')}
+        if job['status'] == 'queued':
+            ahead = [other for other in self.jobs.values() if other['status'] == 'queued'
+                     and (-other['priority'], other['sequence']) < (-job['priority'], job['sequence'])]
+            public['queue_position'] = len(ahead) + 1
+        public.pop('sequence', None)
+        return public
+
+    def _enqueue(self, job):
+        # A re-queued job leaves a stale entry behind; the dispatcher skips it
+        self._sequence += 1
+        job.setdefault('sequence', self._sequence)
+        self._queue.put((-job['priority'], job['sequence'], self._sequence, job['id']))
+
+    def _new_executor(self):
+        return ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                   initargs=self._worker_args)
+
+    def _dispatch(self):
+        """Start queued jobs in priority order whenever a worker is free."""
+        while True:
+            self._slots.acquire()
+            while True:
+                priority, _, _, job_id = self._queue.get()
+                with self._lock:
+                    job = self.jobs[job_id]
+                    if job['status'] == 'queued' and -priority == job['priority']:
+                        job['status'] = 'running'
+                        job['started'] = time.time()
+                        break
+            # Whatever happens to one job, the dispatcher keeps running
+            try:
+                future = self._submit(job)
+            except Exception as e:
+                self._record(job, 'failed', None, f"Could not start the job: {e}")
+                continue
+            future.add_done_callback(lambda future, job=job: self._finish(job, future))
+
+    def _submit(self, job):
+        """Start a job in the worker pool, replacing the pool if it is broken."""
+        split = {} if job['split'] else None
+        page_range = tuple(job['page_range']) if job['page_range'] else None
+        # Jobs for the same document and range would name their output
+        # alike, so every job writes into a directory of its own
+        output_dir = os.path.join(self.output_dir, job['id'])
+        args = (_run_job, job['pdf_path'], page_range, output_dir, job['engine'], split)
+        try:
+            return self._executor.submit(*args)
+        except BrokenProcessPool:
+            # A worker process died (a crashed TTS engine, the OOM killer),
+            # which breaks the whole pool; jobs still running in it fail
+            print("Worker process died; starting a new worker pool")
+            self._executor.shutdown(wait=False)
+            self._executor = self._new_executor()
+            return self._executor.submit(*args)
+
+    def _finish(self, job, future):
+        """Record the outcome of a job."""
+        try:
+            result = future.result()
+            status, output, error = result['status'], result['output'], result['error']
+        except Exception as e:
+            status, output, error = 'failed', None, str(e) or type(e).__name__
+        self._record(job, status, output, error)
+
+    def _record(self, job, status, output, error):
+        """Store the outcome of a job and free its worker."""
+        with self._lock:
+            job['status'] = 'done' if status == 'ok' else 'failed'
+            job['output'] = output
+            job['error'] = error
+            job['finished'] = time.time()
+        self._slots.release()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+def make_handler(service):
+    """Return the request handler class serving a ConversionService."""
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            url = urlsplit(self.path)
+            if url.path.rstrip('/') != '/jobs':
+                self.close_connection = True
+                return self._reply(404, {'error': "Not found"})
+            try:
+                options = {key: values[-1] for key, values in parse_qs(url.query).items()}
+                page_range = parse_page_range(options['pages']) if options.get('pages') else None
+                engine = options.get('engine', 'auto')
+                if engine not in ('auto', 'online', 'offline'):
+                    raise ValueError(f"Invalid engine: {engine}")
+                split = options.get('split', '') in ('1', 'true', 'yes')
+                priority = int(options.get('priority', 0))
+            except (ValueError, argparse.ArgumentTypeError) as e:
+                # The unread upload would be taken for the next request
+                self.close_connection = True
+                return self._reply(400, {'error': str(e)})
+
+            length = int(self.headers.get('Content-Length', 0))
+            if not length:
+                self.close_connection = True
+                return self._reply(400, {'error': "Send the PDF as the request body"})
+            if length > MAX_UPLOAD_BYTES:
+                self.close_connection = True
+                return self._reply(413, {'error': "PDF too large"})
+            doc_hash, pdf_path = service.store_upload(self.rfile, length)
+            job, existing = service.submit(doc_hash, pdf_path, page_range, engine, split, priority)
+            self._reply(200 if existing else 202, dict(job, deduplicated=existing))
+
+        def do_GET(self):
+            parts = [part for part in urlsplit(self.path).path.split('/') if part]
+            if parts == ['jobs']:
+                return self._reply(200, {'jobs': service.list_jobs()})
+            if len(parts) == 2 and parts[0] == 'jobs':
+                job = service.status(parts[1])
+                return self._reply(200, job) if job else self._reply(404, {'error': "Unknown job"})
+            if len(parts) == 3 and parts[0] == 'jobs' and parts[2] == 'audio':
+                output = service.output_path(parts[1])
+                if not output:
+                    return self._reply(404, {'error': "No finished output for this job"})
+                return self._send_file(output)
+            if len(parts) == 4 and parts[0] == 'jobs' and parts[2] == 'files':
+                path = service.output_file(parts[1], unquote(parts[3]))
+                if not path:
+                    return self._reply(404, {'error': "No such file for this job"})
+                return self._send_file(path)
+            self._reply(404, {'error': "Not found"})
+
+        def _reply(self, status, body):
+            data = json.dumps(body, indent=2).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _send_file(self, path):
+            content_type = mimetypes.guess_type(path)[0] or 'audio/mpeg'
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(os.path.getsize(path)))
+            self.end_headers()
+            with open(path, 'rb') as file:
+                while True:
+                    block = file.read(1024 * 1024)
+                    if not block:
+                        break
+                    self.wfile.write(block)
+
+        def log_message(self, format, *args):
+            print(f"{self.address_string()} - {format % args}")
+
+    return Handler
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the PDF to audiobook conversion service.")
+    parser.add_argument('--host', default="127.0.0.1", help="Address to listen on (default: 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=8765, help="Port to listen on (default: 8765)")
+    parser.add_argument('-w', '--workers', type=int, default=2,
+                        help="Conversions running at the same time (default: 2)")
+    parser.add_argument('--synthesis-workers', type=int, default=4,
+                        help="Concurrent TTS requests per conversion (default: 4)")
+    parser.add_argument('--tts-endpoint', help="URL of an HTTP TTS endpoint to use instead of gTTS")
+    parser.add_argument('--async-synthesis', action='store_true',
+                        help="Use the asyncio TTS client (requires aiohttp)")
+    parser.add_argument('--service-dir', default=DEFAULT_SERVICE_DIR,
+                        help=f"Directory for uploads and audio output (default: {DEFAULT_SERVICE_DIR})")
+    args = parser.parse_args(argv)
+
+    service = ConversionService(args.service_dir, args.workers, args.synthesis_workers,
+                                args.tts_endpoint, args.async_synthesis)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(service))
+    server.daemon_threads = True
+    print(f"Conversion service listening on http://{args.host}:{server.server_port} "
+          f"with {service.workers} worker(s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Shutting down...")
+    finally:
+        server.server_close()
+        service.shutdown()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+import queue
+import threading
+import itertools
+from collections import OrderedDict
+from concurrent.futures import Future
+from page_cache import file_hash, text_key
+from extractors import DEFAULT_EXTRACTOR, open_extractor
+
+# Priorities of queued work; lower runs first
+_PRIORITY_STOP = 0
+_PRIORITY_REQUEST = 1
+_PRIORITY_PREFETCH = 2
+
+class PDFDocumentSession:
+    """
+    Long-lived handle on one open PDF. The file is parsed once and pages
+    are extracted lazily on a background thread, so callers never block:
+    every lookup returns a Future. Pages next to the last requested one are
+    prefetched, and extracted text is kept in memory and in the shared page
+    cache.
+    """
+    def __init__(self, pdf_path, page_cache, prefetch=2, memory_pages=64, extractor_for=None):
+        """
+        Args:
+            pdf_path (str): Path to the PDF file
+            page_cache (PageTextCache): Shared on-disk page text cache
+            prefetch (int): Number of pages prefetched on each side of a
+                requested page
+            memory_pages (int): Number of page texts kept in memory
+            extractor_for: Optional callable returning the name of the
+                extraction backend for a PDF path, such as
+                PDFToAudioConverter.extractor_for; called on the session's
+                thread, since choosing a backend may mean calibrating
+        """
+        self.pdf_path = pdf_path
+        self.page_cache = page_cache
+        self.prefetch = prefetch
+        self.memory_pages = memory_pages
+        self.doc_hash = None
+        self.total_pages = None
+        self.extractor = None
+        self._extractor_for = extractor_for
+        self._text_key = None
+
+        # Resolves to the page count once the document is open
+        self.ready = Future()
+
+        self._pages = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._tasks = queue.PriorityQueue()
+        self._order = itertools.count()
+        self._document = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def get_page(self, page_num):
+        """
+        Request the text of a page (0-based) and prefetch its neighbours.
+
+        Returns:
+            Future: Resolves to the page text
+        """
+        future = self._schedule(page_num, _PRIORITY_REQUEST)
+        for distance in range(1, self.prefetch + 1):
+            for neighbour in (page_num + distance, page_num - distance):
+                if self.total_pages and 0 <= neighbour < self.total_pages:
+                    self._schedule(neighbour, _PRIORITY_PREFETCH)
+        return future
+
+    def close(self):
+        """Stop the background thread and release the PDF file."""
+        self._tasks.put((_PRIORITY_STOP, next(self._order), None))
+
+    def _schedule(self, page_num, priority):
+        """Return a Future for a page, queueing its extraction if needed."""
+        with self._lock:
+            if page_num in self._pages:
+                self._pages.move_to_end(page_num)
+                future = Future()
+                future.set_result(self._pages[page_num])
+                return future
+            future = self._pending.get(page_num)
+            if future is None:
+                future = self._pending[page_num] = Future()
+            elif priority == _PRIORITY_PREFETCH:
+                return future
+        # A page already queued for prefetch is queued again so an explicit
+        # request doesn't wait behind other prefetches
+        self._tasks.put((priority, next(self._order), page_num))
+        return future
+
+    def _run(self):
+        """Open the document, then serve page requests until closed."""
+        try:
+            self.doc_hash = file_hash(self.pdf_path)
+            self.extractor = self._extractor_for(self.pdf_path) if self._extractor_for else DEFAULT_EXTRACTOR
+            self._text_key = text_key(self.doc_hash, self.extractor)
+            self.total_pages = self.page_cache.get_page_count(self.doc_hash)
+            if self.total_pages is None:
+                self.total_pages = self._get_document().page_count
+                self.page_cache.put_page_count(self.doc_hash, self.total_pages)
+            self.ready.set_result(self.total_pages)
+        except Exception as e:
+            self.ready.set_exception(e)
+            self._release()
+            return
+
+        while True:
+            _, _, page_num = self._tasks.get()
+            if page_num is None:
+                break
+            with self._lock:
+                future = self._pending.get(page_num)
+            if future is None:
+                continue
+            try:
+                text = self._load_page(page_num)
+                with self._lock:
+                    self._remember(page_num, text)
+                    del self._pending[page_num]
+                future.set_result(text)
+            except Exception as e:
+                with self._lock:
+                    del self._pending[page_num]
+                future.set_exception(e)
+
+        with self._lock:
+            for future in self._pending.values():
+                future.cancel()
+            self._pending.clear()
+        self._release()
+
+    def _load_page(self, page_num):
+        """Return the text of a page from the cache or the PDF."""
+        if not 0 <= page_num < self.total_pages:
+            raise IndexError(f"Page {page_num + 1} is out of range")
+        text = self.page_cache.get(self._text_key, page_num)
+        if text is None:
+            text = self._get_document().extract(page_num)
+            self.page_cache.put(self._text_key, page_num, text)
+        return text
+
+    def _get_document(self):
+        """Open the PDF with the extraction backend on first use and keep it open."""
+        if self._document is None:
+            self._document = open_extractor(self.extractor, self.pdf_path)
+        return self._document
+
+    def _remember(self, page_num, text):
+        """Keep a page in memory, dropping the least recently used ones."""
+        self._pages[page_num] = text
+        self._pages.move_to_end(page_num)
+        while len(self._pages) > self.memory_pages:
+            self._pages.popitem(last=False)
+
+    def _release(self):
+        if self._document:
+            self._document.close()
+            self._document = None
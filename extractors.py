@@ -0,0 +1,268 @@
+"""
+Text extraction backends.
+
+Every backend opens one PDF and extracts the text of single pages:
+
+    with open_extractor("pdfium", pdf_path) as document:
+        text = document.extract(0)
+
+PyPDF2 is always available; pypdf, pdfminer.six and pypdfium2 are used
+when they are installed. calibrate() times the available backends on a
+sample of a document's pages and picks the fastest one whose text is as
+complete and readable as the best of them.
+
+Usage:
+    python extractors.py book.pdf --sample-pages 12
+"""
+import re
+import sys
+import time
+import argparse
+import threading
+import importlib.util
+
+DEFAULT_EXTRACTOR = "pypdf2"
+
+# Pages extracted by every backend when calibrating
+CALIBRATION_SAMPLE_PAGES = 8
+
+# A backend's text is usable if it holds at least this share of the
+# characters and is within this much of the word share of the best backend
+CALIBRATION_MIN_CHARS_SHARE = 0.9
+CALIBRATION_QUALITY_MARGIN = 0.05
+
+# PDFium may not be called from two threads at once, even for different
+# documents
+_pdfium_lock = threading.Lock()
+
+# A word, possibly hyphenated or with an apostrophe, with the punctuation
+# around it
+_WORD = re.compile(r"[\"'(\[]*[^\W\d_]+(?:['’-][^\W\d_]+)*[\"')\].,;:!?]*")
+
+class PyPDF2Extractor:
+    """Extraction with PyPDF2, pure Python and always installed."""
+    name = "pypdf2"
+    module = "PyPDF2"
+
+    def __init__(self, pdf_path):
+        """
+        Args:
+            pdf_path (str): Path to the PDF file
+        """
+        library = importlib.import_module(self.module)
+        self._file = open(pdf_path, 'rb')
+        try:
+            self._reader = library.PdfReader(self._file)
+        except BaseException:
+            self._file.close()
+            raise
+
+    @property
+    def page_count(self):
+        return len(self._reader.pages)
+
+    def extract(self, page_num):
+        """Return the text of a page (0-based)."""
+        return self._reader.pages[page_num].extract_text() or ""
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class PypdfExtractor(PyPDF2Extractor):
+    """Extraction with pypdf, the maintained successor of PyPDF2."""
+    name = "pypdf"
+    module = "pypdf"
+
+class PDFMinerExtractor(PyPDF2Extractor):
+    """
+    Extraction with pdfminer.six, which analyses the page layout: slower,
+    but it keeps columns and reading order apart where PyPDF2 mixes them.
+    """
+    name = "pdfminer"
+    module = "pdfminer"
+
+    def __init__(self, pdf_path):
+        from pdfminer.pdfparser import PDFParser
+        from pdfminer.pdfdocument import PDFDocument
+        from pdfminer.pdfpage import PDFPage
+        from pdfminer.pdfinterp import PDFResourceManager
+        self._file = open(pdf_path, 'rb')
+        try:
+            self._pages = list(PDFPage.create_pages(PDFDocument(PDFParser(self._file))))
+        except BaseException:
+            self._file.close()
+            raise
+        self._resources = PDFResourceManager(caching=True)
+
+    @property
+    def page_count(self):
+        return len(self._pages)
+
+    def extract(self, page_num):
+        import io
+        from pdfminer.converter import TextConverter
+        from pdfminer.layout import LAParams
+        from pdfminer.pdfinterp import PDFPageInterpreter
+        output = io.StringIO()
+        device = TextConverter(self._resources, output, laparams=LAParams())
+        try:
+            PDFPageInterpreter(self._resources, device).process_page(self._pages[page_num])
+        finally:
+            device.close()
+        # pdfminer ends every page with a form feed
+        return output.getvalue().replace('\x0c', '')
+
+class PdfiumExtractor(PyPDF2Extractor):
+    """
+    Extraction with pypdfium2 (PDFium, the engine of Chrome's PDF viewer),
+    by far the fastest. Calls into PDFium are serialized across threads;
+    use worker processes to extract in parallel.
+    """
+    name = "pdfium"
+    module = "pypdfium2"
+
+    def __init__(self, pdf_path):
+        import pypdfium2
+        with _pdfium_lock:
+            self._pdf = pypdfium2.PdfDocument(pdf_path)
+            self._page_count = len(self._pdf)
+
+    @property
+    def page_count(self):
+        return self._page_count
+
+    def extract(self, page_num):
+        with _pdfium_lock:
+            page = self._pdf[page_num]
+            try:
+                text_page = page.get_textpage()
+                try:
+                    return text_page.get_text_range().replace('\r\n', '\n')
+                finally:
+                    text_page.close()
+            finally:
+                page.close()
+
+    def close(self):
+        with _pdfium_lock:
+            self._pdf.close()
+
+EXTRACTORS = {extractor.name: extractor
+              for extractor in (PyPDF2Extractor, PypdfExtractor, PDFMinerExtractor, PdfiumExtractor)}
+
+def available_extractors():
+    """Return the names of the backends whose library is installed."""
+    return [name for name, extractor in EXTRACTORS.items() if importlib.util.find_spec(extractor.module)]
+
+def open_extractor(name, pdf_path):
+    """
+    Open a PDF with a text extraction backend.
+
+    Args:
+        name (str): Backend name, one of EXTRACTORS
+        pdf_path (str): Path to the PDF file
+    Returns:
+        The opened document, with page_count, extract(page_num) and close()
+    """
+    if name not in EXTRACTORS:
+        raise Exception(f"Unknown text extractor: {name}")
+    return EXTRACTORS[name](pdf_path)
+
+def text_quality(text):
+    """
+    Rough readability of extracted text, between 0 and 1: the share of
+    tokens that are words. Text with spaces lost between words or inserted
+    between letters scores low even when nothing is missing.
+    """
+    tokens = text.split()
+    if not tokens:
+        return 0.0
+    words = [token for token in tokens if _WORD.fullmatch(token)]
+    letters = sum(len(word) for word in words) / len(words) if words else 0
+    # Words of one or two letters on average are letters spaced apart, and
+    # very long ones words run together
+    if not 2.5 <= letters <= 12:
+        return len(words) / len(tokens) / 2
+    return len(words) / len(tokens)
+
+def sample_pages(page_count, count=CALIBRATION_SAMPLE_PAGES):
+    """Return up to `count` evenly spread 0-based page numbers."""
+    if page_count <= count:
+        return list(range(page_count))
+    step = page_count / count
+    return [int(step * i + step / 2) for i in range(count)]
+
+def calibrate(pdf_path, names=None, sample_size=CALIBRATION_SAMPLE_PAGES):
+    """
+    Time the extraction backends on a sample of a document's pages and pick
+    the fastest one whose text is usable: about as many characters and as
+    readable (see text_quality) as the best backend's.
+
+    Args:
+        pdf_path (str): Path to the PDF file
+        names (list): Backends to try; defaults to all installed ones
+        sample_size (int): Number of pages extracted by every backend
+    Returns:
+        tuple: (name of the chosen backend, dict of per-backend results
+            with 'seconds', 'chars', 'quality' and 'usable', or 'error')
+    """
+    names = names or available_extractors()
+    results = {}
+    pages = None
+    for name in names:
+        try:
+            # Loading the library once isn't part of a backend's speed
+            importlib.import_module(EXTRACTORS[name].module)
+            start_time = time.perf_counter()
+            with open_extractor(name, pdf_path) as document:
+                if pages is None:
+                    pages = sample_pages(document.page_count, sample_size)
+                text = "\n".join(document.extract(page_num) for page_num in pages)
+        except Exception as e:
+            results[name] = {'error': str(e), 'usable': False}
+            continue
+        results[name] = {
+            'seconds': round(time.perf_counter() - start_time, 4),
+            'chars': len(''.join(text.split())),
+            'quality': round(text_quality(text), 3),
+        }
+
+    measured = [result for result in results.values() if 'error' not in result]
+    best_chars = max((result['chars'] for result in measured), default=0)
+    best_quality = max((result['quality'] for result in measured), default=0.0)
+    for result in measured:
+        result['usable'] = bool(result['chars']) and \
+            result['chars'] >= best_chars * CALIBRATION_MIN_CHARS_SHARE and \
+            result['quality'] >= best_quality - CALIBRATION_QUALITY_MARGIN
+
+    usable = [name for name in names if results[name]['usable']]
+    if not usable:
+        # No text from anyone (a scanned PDF, say); any backend will do
+        return (DEFAULT_EXTRACTOR if DEFAULT_EXTRACTOR in names else names[0]), results
+    return min(usable, key=lambda name: results[name]['seconds']), results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the text extractors on a PDF.")
+    parser.add_argument('pdf', help="PDF file to calibrate on")
+    parser.add_argument('--sample-pages', type=int, default=CALIBRATION_SAMPLE_PAGES,
+                        help=f"Pages extracted by every backend (default: {CALIBRATION_SAMPLE_PAGES})")
+    args = parser.parse_args(argv)
+
+    chosen, results = calibrate(args.pdf, sample_size=args.sample_pages)
+    for name, result in results.items():
+        if 'error' in result:
+            print(f"{name:10} error: {result['error']}")
+        else:
+            print(f"{name:10} {result['seconds']:8.3f}s {result['chars']:9} chars  "
+                  f"quality {result['quality']:.2f}{'' if result['usable'] else '  (unusable)'}")
+    print(f"Chosen: {chosen}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
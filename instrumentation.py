@@ -0,0 +1,311 @@
+import sys
+import time
+import threading
+from contextlib import contextmanager
+
+STAGES = ('extraction', 'preprocessing', 'detection', 'synthesis')
+
+def peak_memory_bytes():
+    """
+    Return the peak resident memory of this process so far, or None where
+    it can't be measured (Windows without psutil).
+    """
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports kilobytes, macOS bytes
+        return peak if sys.platform == 'darwin' else peak * 1024
+    except ImportError:
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().peak_wset
+    except (ImportError, AttributeError):
+        return None
+
+def _percentile(sorted_values, share):
+    index = min(len(sorted_values) - 1, int(round(share * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+class StageStats:
+    """Timings and counters of one pipeline stage."""
+    def __init__(self):
+        self.start = None
+        self.end = None
+        self.busy_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.pages = 0
+        self.chars = 0
+        self.chunks = 0
+        self.peak_memory_bytes = None
+
+    def as_dict(self):
+        wall = (self.end - self.start) if self.start is not None and self.end is not None else 0.0
+        result = {
+            'wall_seconds': round(wall, 4),
+            'busy_seconds': round(self.busy_seconds, 4),
+            'cpu_seconds': round(self.cpu_seconds, 4),
+            'pages': self.pages,
+            'chars': self.chars,
+            'chunks': self.chunks,
+            'peak_memory_bytes': self.peak_memory_bytes,
+        }
+        for unit in ('pages', 'chars', 'chunks'):
+            result[f'{unit}_per_second'] = round(getattr(self, unit) / wall, 2) if wall > 0 else 0.0
+        return result
+
+class ConversionProfiler:
+    """
+    Collects wall time, CPU time, peak memory and throughput per stage
+    (extraction, preprocessing, detection, synthesis) plus the latency of
+    every synthesized chunk.
+
+    Stages of the streaming pipeline overlap, so a stage's wall time is the
+    span from its first to its last piece of work, its busy time the sum of
+    the time spent inside it and its CPU time that of the threads running
+    it. Pages extracted in worker processes don't count towards CPU time.
+
+    Hooks are called with an event dict on every update:
+        {'event': 'start', 'pages': ..., 'chars': ...}
+        {'event': 'progress', 'stage': ..., 'stats': {...}}
+        {'event': 'chunk', 'latency': ..., 'cached': ..., 'chars': ..., 'language': ...,
+         'page': ...}
+        {'event': 'resumed', 'chunks': ..., 'chars': ...}
+        {'event': 'report', 'report': {...}}
+    They are called from the pipeline's worker threads and must be quick
+    and thread-safe.
+    """
+    def __init__(self, hooks=()):
+        """
+        Args:
+            hooks: Callables receiving every event
+        """
+        self.hooks = list(hooks)
+        self.start_time = time.perf_counter()
+        self.chunk_latencies = []
+        self.cached_chunks = 0
+        self._stages = {}
+        self._lock = threading.Lock()
+
+    def _emit(self, event):
+        for hook in self.hooks:
+            hook(event)
+
+    def set_total_pages(self, pages, chars=None):
+        """
+        Announce how many pages the conversion covers and, if the PDF's
+        page index is known, how many characters (either None if unknown).
+        """
+        self._emit({'event': 'start', 'pages': pages, 'chars': chars})
+
+    def _stats(self, stage):
+        if stage not in self._stages:
+            self._stages[stage] = StageStats()
+        return self._stages[stage]
+
+    def begin(self, stage):
+        """Mark the start of a stage, if it hasn't started yet."""
+        with self._lock:
+            stats = self._stats(stage)
+            if stats.start is None:
+                stats.start = time.perf_counter()
+
+    def update(self, stage, busy=0.0, cpu=0.0, pages=0, chars=0, chunks=0):
+        """Add work done by a stage and notify the hooks."""
+        now = time.perf_counter()
+        memory = peak_memory_bytes()
+        with self._lock:
+            stats = self._stats(stage)
+            if stats.start is None:
+                stats.start = now - busy
+            stats.end = now
+            stats.busy_seconds += busy
+            stats.cpu_seconds += cpu
+            stats.pages += pages
+            stats.chars += chars
+            stats.chunks += chunks
+            stats.peak_memory_bytes = memory
+            snapshot = stats.as_dict()
+        self._emit({'event': 'progress', 'stage': stage, 'stats': snapshot})
+
+    @contextmanager
+    def stage(self, stage, **counts):
+        """Time a block of work as part of a stage, adding counts when it ends."""
+        self.begin(stage)
+        wall, cpu = time.perf_counter(), time.thread_time()
+        yield
+        self.update(stage, time.perf_counter() - wall, time.thread_time() - cpu, **counts)
+
+    def track(self, stage, iterable, measure=None):
+        """
+        Time the production of every item of an iterable as part of a stage.
+
+        Args:
+            stage (str): Stage name
+            iterable: Items produced by the stage
+            measure: Optional callable returning the counts of an item,
+                e.g. lambda page: {'pages': 1, 'chars': len(page[1])}
+        Yields:
+            The items of the iterable
+        """
+        self.begin(stage)
+        iterator = iter(iterable)
+        while True:
+            wall, cpu = time.perf_counter(), time.thread_time()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            counts = measure(item) if measure else {}
+            self.update(stage, time.perf_counter() - wall, time.thread_time() - cpu, **counts)
+            yield item
+
+    def record_chunk(self, latency, cpu, chars, cached, language, page=None):
+        """
+        Record one synthesized chunk; cached chunks have no network latency.
+        page is the chunk's 0-based source page, or None if unknown.
+        """
+        with self._lock:
+            if cached:
+                self.cached_chunks += 1
+            else:
+                self.chunk_latencies.append(latency)
+        self._emit({'event': 'chunk', 'latency': latency, 'cached': cached,
+                    'chars': chars, 'language': language, 'page': page})
+        self.update('synthesis', busy=latency, cpu=cpu, chars=chars, chunks=1)
+
+    def record_resumed(self, chunks, chars):
+        """Record chunks kept from an interrupted earlier run of the conversion."""
+        self._emit({'event': 'resumed', 'chunks': chunks, 'chars': chars})
+
+    def report(self):
+        """Return the profile as a JSON-serializable dict."""
+        with self._lock:
+            stages = {name: stats.as_dict() for name, stats in self._stages.items()}
+            latencies = sorted(self.chunk_latencies)
+            cached = self.cached_chunks
+        chunks = {'synthesized': len(latencies), 'cached': cached}
+        if latencies:
+            chunks['latency_seconds'] = {
+                'mean': round(sum(latencies) / len(latencies), 4),
+                'p50': round(_percentile(latencies, 0.5), 4),
+                'p95': round(_percentile(latencies, 0.95), 4),
+                'max': round(latencies[-1], 4),
+            }
+        return {
+            'total_seconds': round(time.perf_counter() - self.start_time, 4),
+            'peak_memory_bytes': peak_memory_bytes(),
+            'stages': stages,
+            'chunks': chunks,
+        }
+
+    def finish(self):
+        """Build the final report and pass it to the hooks."""
+        report = self.report()
+        self._emit({'event': 'report', 'report': report})
+        return report
+
+    def summary(self):
+        """Return a one-line summary of the profile for status displays."""
+        report = self.report()
+        parts = []
+        for name in STAGES:
+            stats = report['stages'].get(name)
+            if not stats:
+                continue
+            part = f"{name} {stats['wall_seconds']:.1f}s"
+            if name == 'extraction' and stats['pages']:
+                part += f" ({stats['pages_per_second']:.0f} pages/s)"
+            elif name == 'synthesis' and stats['chunks']:
+                part += f" ({stats['chunks_per_second']:.1f} chunks/s)"
+            parts.append(part)
+        if report['peak_memory_bytes']:
+            parts.append(f"peak {report['peak_memory_bytes'] / (1024 * 1024):.0f} MB")
+        return " | ".join(parts)
+
+def format_duration(seconds):
+    """Format seconds as "m:ss", or "h:mm:ss" from an hour up."""
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+class ProgressTracker:
+    """
+    Turns profiler events into overall progress and an ETA.
+
+    Progress is the share of the text synthesized so far, including chunks
+    kept from an interrupted earlier run. The total comes from the PDF's
+    page index when there is one, and is otherwise estimated from the
+    characters per page extracted so far; the time left comes from the
+    synthesis throughput since the first chunk. Feed it
+    events with update(); it is not thread-safe, so call it from one thread
+    (the GUI's main loop).
+    """
+    def __init__(self):
+        self.reset()
+
+    def reset(self, total_pages=None, total_chars=None):
+        self.total_pages = total_pages
+        self.total_chars = total_chars
+        self.pages = 0
+        self.chars = 0
+        self.chunks = 0
+        self.synthesized_chars = 0
+        self.resumed_chars = 0
+        self.synthesis_start = None
+
+    def update(self, event):
+        """Account for one profiler event."""
+        kind = event['event']
+        if kind == 'start':
+            self.reset(event['pages'], event.get('chars'))
+        elif kind == 'progress' and event['stage'] == 'extraction':
+            self.pages = event['stats']['pages']
+            self.chars = event['stats']['chars']
+        elif kind == 'chunk':
+            if self.synthesis_start is None:
+                self.synthesis_start = time.perf_counter() - event['latency']
+            self.chunks += 1
+            self.synthesized_chars += event['chars']
+        elif kind == 'resumed':
+            self.chunks += event['chunks']
+            self.resumed_chars += event['chars']
+
+    def estimated_chars(self):
+        """Estimated characters in the whole conversion, or None before the first page."""
+        if self.total_chars:
+            return self.total_chars
+        if not self.pages:
+            return None
+        if not self.total_pages or self.pages >= self.total_pages:
+            return self.chars
+        return self.chars / self.pages * self.total_pages
+
+    @property
+    def fraction(self):
+        """Share of the conversion done, between 0 and 1."""
+        total = self.estimated_chars()
+        return min(1.0, (self.resumed_chars + self.synthesized_chars) / total) if total else 0.0
+
+    def eta(self):
+        """Estimated seconds left, or None until there is a throughput to go by."""
+        total = self.estimated_chars()
+        if not total or self.synthesis_start is None or not self.synthesized_chars:
+            return None
+        # Chunks kept from an earlier run took no time in this one
+        rate = self.synthesized_chars / max(time.perf_counter() - self.synthesis_start, 1e-6)
+        return max(0.0, total - self.resumed_chars - self.synthesized_chars) / rate
+
+    def describe(self):
+        """Return a one-line progress description for status displays."""
+        parts = []
+        if self.total_pages:
+            parts.append(f"Page {min(self.pages, self.total_pages)}/{self.total_pages}")
+        elif self.pages:
+            parts.append(f"Page {self.pages}")
+        parts.append(f"{self.chunks} chunk(s) synthesized")
+        parts.append(f"{self.fraction:.0%}")
+        eta = self.eta()
+        if eta is not None:
+            parts.append(f"about {format_duration(eta)} left")
+        return " | ".join(parts)
@@ -0,0 +1,217 @@
+import os
+import time
+import hashlib
+import sqlite3
+import threading
+from extractors import DEFAULT_EXTRACTOR, open_extractor
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "pdf_audiobook")
+
+# Upper bound on the total size of cached page text
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+_hash_memo = {}
+_hash_lock = threading.Lock()
+
+def file_hash(path):
+    """
+    Return the SHA-256 of a file's content. The result is remembered for
+    the lifetime of the process as long as the file's size and modification
+    time don't change, so repeated lookups don't re-read large PDFs.
+
+    Args:
+        path (str): Path to the file
+    Returns:
+        str: Hex digest of the file content
+    """
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    key = (path, stat.st_size, stat.st_mtime_ns)
+    with _hash_lock:
+        if key in _hash_memo:
+            return _hash_memo[key]
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(block)
+
+    with _hash_lock:
+        _hash_memo[key] = digest.hexdigest()
+    return _hash_memo[key]
+
+def text_key(doc_hash, extractor=DEFAULT_EXTRACTOR):
+    """
+    Return the key under which a document's page text extracted with a
+    given backend is cached. Text from the default backend is keyed by the
+    bare content hash, as before backends could be chosen.
+    """
+    return doc_hash if extractor == DEFAULT_EXTRACTOR else f"{doc_hash}:{extractor}"
+
+class SizeCap:
+    """
+    Eviction policy shared by the on-disk caches: total up the cache size
+    once another 1/64 of the cap has been written since the last check,
+    and when it is over the cap, evict least recently used entries down to
+    90% of it, so there isn't an eviction on every write. Not thread-safe;
+    callers hold their cache's lock.
+    """
+    def __init__(self, max_bytes):
+        """
+        Args:
+            max_bytes (int): Size cap of the cache
+        """
+        self.max_bytes = max_bytes
+        self._unchecked_bytes = 0
+
+    def added(self, size):
+        """Account for `size` bytes written; return True if it's time to check the total."""
+        self._unchecked_bytes += size
+        if self._unchecked_bytes > self.max_bytes // 64:
+            self._unchecked_bytes = 0
+            return True
+        return False
+
+    def victims(self, total, entries):
+        """
+        Pick the entries to evict.
+
+        Args:
+            total (int): Current size of the cache
+            entries: Iterable of (size, entry) tuples, least recently used
+                first; only consumed when the cache is over its cap
+        Returns:
+            list: The entries to evict, possibly none
+        """
+        if total <= self.max_bytes:
+            return []
+        excess = total - int(self.max_bytes * 0.9)
+        victims = []
+        for size, entry in entries:
+            if excess <= 0:
+                break
+            victims.append(entry)
+            excess -= size
+        return victims
+
+class PageTextCache:
+    """
+    On-disk cache of extracted page text, keyed by the PDF's content hash
+    (see text_key) and the 0-based page index. Entries are evicted least
+    recently used first once the cache grows past its size cap. Backed by
+    SQLite so the GUI, the CLI and batch workers can share one cache
+    directory.
+    """
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        Args:
+            cache_dir (str): Directory holding the cache database
+            max_bytes (int): Size cap for the cached text
+        """
+        os.makedirs(cache_dir, exist_ok=True)
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._size_cap = SizeCap(max_bytes)
+
+        self._db = sqlite3.connect(os.path.join(cache_dir, "page_text.db"),
+                                   timeout=30, check_same_thread=False)
+        with self._lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("""CREATE TABLE IF NOT EXISTS pages (
+                doc_hash TEXT, page_num INTEGER, text TEXT, size INTEGER, last_used REAL,
+                PRIMARY KEY (doc_hash, page_num))""")
+            self._db.execute("CREATE INDEX IF NOT EXISTS pages_last_used ON pages(last_used)")
+            self._db.execute("""CREATE TABLE IF NOT EXISTS documents (
+                doc_hash TEXT PRIMARY KEY, page_count INTEGER)""")
+            self._db.execute("""CREATE TABLE IF NOT EXISTS extractors (
+                doc_hash TEXT PRIMARY KEY, extractor TEXT)""")
+
+    def get(self, doc_hash, page_num):
+        """Return the cached text of a page, or None if it isn't cached."""
+        with self._lock, self._db:
+            row = self._db.execute("SELECT text FROM pages WHERE doc_hash = ? AND page_num = ?",
+                                   (doc_hash, page_num)).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE pages SET last_used = ? WHERE doc_hash = ? AND page_num = ?",
+                             (time.time(), doc_hash, page_num))
+            return row[0]
+
+    def put(self, doc_hash, page_num, text):
+        """Store the text of a page, evicting old entries if the cache is full."""
+        size = len(text.encode('utf-8'))
+        with self._lock, self._db:
+            self._db.execute("INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?)",
+                             (doc_hash, page_num, text, size, time.time()))
+            if self._size_cap.added(size):
+                self._evict()
+
+    def cached_pages(self, doc_hash):
+        """Return the set of page indices cached for a document."""
+        with self._lock:
+            rows = self._db.execute("SELECT page_num FROM pages WHERE doc_hash = ?", (doc_hash,))
+            return {row[0] for row in rows}
+
+    def get_page_count(self, doc_hash):
+        """Return the cached page count of a document, or None."""
+        with self._lock:
+            row = self._db.execute("SELECT page_count FROM documents WHERE doc_hash = ?",
+                                   (doc_hash,)).fetchone()
+            return row[0] if row else None
+
+    def put_page_count(self, doc_hash, page_count):
+        """Remember the page count of a document."""
+        with self._lock, self._db:
+            self._db.execute("INSERT OR REPLACE INTO documents VALUES (?, ?)", (doc_hash, page_count))
+
+    def get_extractor(self, doc_hash):
+        """Return the extraction backend chosen for a document, or None."""
+        with self._lock:
+            row = self._db.execute("SELECT extractor FROM extractors WHERE doc_hash = ?",
+                                   (doc_hash,)).fetchone()
+            return row[0] if row else None
+
+    def put_extractor(self, doc_hash, extractor):
+        """Remember the extraction backend chosen for a document."""
+        with self._lock, self._db:
+            self._db.execute("INSERT OR REPLACE INTO extractors VALUES (?, ?)", (doc_hash, extractor))
+
+    def page_count(self, pdf_path, extractor=DEFAULT_EXTRACTOR):
+        """
+        Return the number of pages in a PDF, parsing it only if the count
+        isn't cached yet.
+        """
+        doc_hash = file_hash(pdf_path)
+        page_count = self.get_page_count(doc_hash)
+        if page_count is None:
+            with open_extractor(extractor, pdf_path) as document:
+                page_count = document.page_count
+            self.put_page_count(doc_hash, page_count)
+        return page_count
+
+    def page_text(self, pdf_path, page_num, extractor=DEFAULT_EXTRACTOR):
+        """
+        Return the text of one page (0-based), extracting and caching it on
+        a miss.
+        """
+        doc_hash = file_hash(pdf_path)
+        key = text_key(doc_hash, extractor)
+        text = self.get(key, page_num)
+        if text is None:
+            with open_extractor(extractor, pdf_path) as document:
+                self.put_page_count(doc_hash, document.page_count)
+                text = document.extract(page_num)
+            self.put(key, page_num, text)
+        return text
+
+    def _evict(self):
+        """Drop least recently used pages until the cache is under its cap."""
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        def pages_by_last_use():
+            # Only queried when the cache is over its cap
+            for doc_hash, page_num, size in self._db.execute(
+                    "SELECT doc_hash, page_num, size FROM pages ORDER BY last_used").fetchall():
+                yield size, (doc_hash, page_num)
+        victims = self._size_cap.victims(total, pages_by_last_use())
+        self._db.executemany("DELETE FROM pages WHERE doc_hash = ? AND page_num = ?", victims)
@@ -0,0 +1,178 @@
+import os
+import json
+import PyPDF2
+from chapters import read_outline
+from instrumentation import format_duration
+
+PAGE_INDEX_VERSION = 1
+
+# Average speaking rate of the TTS voices in characters per second, about
+# 150 words a minute
+SPEECH_CHARS_PER_SECOND = 15.0
+
+def is_empty_text(text):
+    """
+    Whether extracted page text has nothing to read out: no letters or
+    digits at all, or nothing but a page number.
+    """
+    stripped = text.strip()
+    if stripped.isdigit() and len(stripped) <= 4:
+        return True
+    return not any(character.isalnum() for character in stripped)
+
+def _has_images(page):
+    """Whether a page draws image XObjects, as scanned pages do."""
+    try:
+        resources = page.get('/Resources')
+        xobjects = resources.get_object().get('/XObject') if resources else None
+        if not xobjects:
+            return False
+        return any(xobject.get_object().get('/Subtype') == '/Image'
+                   for xobject in xobjects.get_object().values())
+    except Exception:
+        return False
+
+class PageIndex:
+    """
+    Summary of every page of a PDF, built in a single pass over its text:
+    character count, whether the page has no text (and if so whether it is
+    an image-only scan), the top-level outline entry it belongs to and an
+    estimate of its speech duration. It is saved under the PDF's content
+    hash, so page range checks, previews and duration estimates never have
+    to parse the PDF again.
+
+    Pages are numbered from 1, as shown to users.
+    """
+    def __init__(self, doc_hash, pages, outline):
+        """
+        Args:
+            doc_hash (str): Content hash of the PDF
+            pages (list): Page dicts with 'page', 'chars', 'empty',
+                'image_only', 'chapter' and 'seconds', in page order
+            outline (list): (title, start_page) tuples from read_outline
+        """
+        self.doc_hash = doc_hash
+        self.pages = pages
+        self.outline = [tuple(entry) for entry in outline]
+
+    @property
+    def total_pages(self):
+        return len(self.pages)
+
+    @staticmethod
+    def path_for(cache_dir, key):
+        """Path of the index saved under a page text key (see page_cache.text_key)."""
+        return os.path.join(cache_dir, "page_index", f"{key.replace(':', '-')}.json")
+
+    @classmethod
+    def build(cls, pdf_path, doc_hash, page_texts):
+        """
+        Index a PDF from the text of all of its pages.
+
+        Args:
+            pdf_path (str): Path to the PDF file
+            doc_hash (str): Content hash of the PDF
+            page_texts: Iterable of (page_num, text) tuples with 0-based
+                page numbers, covering the whole document in order
+        Returns:
+            PageIndex: The new index
+        """
+        outline = read_outline(pdf_path)
+        starts = {page: title for title, page in outline}
+        pages = []
+        chapter = None
+        with open(pdf_path, 'rb') as file:
+            pdf_reader = None
+            for page_num, text in page_texts:
+                chapter = starts.get(page_num + 1, chapter)
+                empty = is_empty_text(text)
+                image_only = False
+                if empty:
+                    # Only pages without text are looked at for images
+                    if pdf_reader is None:
+                        pdf_reader = PyPDF2.PdfReader(file)
+                    image_only = _has_images(pdf_reader.pages[page_num])
+                chars = 0 if empty else len(' '.join(text.split()))
+                pages.append({
+                    'page': page_num + 1,
+                    'chars': chars,
+                    'empty': empty,
+                    'image_only': image_only,
+                    'chapter': chapter,
+                    'seconds': round(chars / SPEECH_CHARS_PER_SECOND, 1),
+                })
+        return cls(doc_hash, pages, outline)
+
+    @classmethod
+    def load(cls, path):
+        """Return the index stored at path, or None if there is no usable one."""
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return None
+        if data.get('version') != PAGE_INDEX_VERSION:
+            return None
+        return cls(data['doc_hash'], data['pages'], data['outline'])
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = {
+            'version': PAGE_INDEX_VERSION,
+            'doc_hash': self.doc_hash,
+            'outline': self.outline,
+            'pages': self.pages,
+        }
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            json.dump(data, file)
+        os.replace(temp_path, path)
+
+    def page(self, page):
+        """Return the entry of a page (1-based)."""
+        return self.pages[page - 1]
+
+    def select(self, page_range=None):
+        """Return the entries of a page range, or of every page."""
+        if not page_range:
+            return self.pages
+        return self.pages[max(0, page_range[0] - 1):page_range[1]]
+
+    def empty_pages(self, page_range=None):
+        """Return the numbers of the pages without text in a range."""
+        return [entry['page'] for entry in self.select(page_range) if entry['empty']]
+
+    def chars(self, page_range=None):
+        return sum(entry['chars'] for entry in self.select(page_range))
+
+    def seconds(self, page_range=None):
+        """Estimated speech duration of a page range."""
+        return self.chars(page_range) / SPEECH_CHARS_PER_SECOND
+
+    def check_range(self, page_range):
+        """
+        Check a page range before converting it.
+
+        Returns:
+            str: Why the range can't be converted, or None if it can
+        """
+        start, end = page_range
+        if not 1 <= start <= end <= self.total_pages:
+            return f"Invalid page range. Please enter values between 1 and {self.total_pages}"
+        if not self.chars(page_range):
+            kind = "image-only" if all(entry['image_only'] for entry in self.select(page_range)) else "empty"
+            pages = f"Page {start} has" if start == end else f"Pages {start}-{end} have"
+            return f"{pages} no readable text ({kind}); choose other pages"
+        return None
+
+    def describe(self, page_range=None):
+        """Return a one-line summary of a page range for status displays."""
+        entries = self.select(page_range)
+        parts = [f"{len(entries)} page(s)"]
+        empty = self.empty_pages(page_range)
+        if empty:
+            image_only = sum(1 for entry in entries if entry['image_only'])
+            parts.append(f"{len(empty)} without text ({image_only} image-only)" if image_only
+                         else f"{len(empty)} without text")
+        parts.append(f"about {format_duration(self.seconds(page_range))} of audio")
+        return ", ".join(parts)
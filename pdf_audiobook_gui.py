@@ -2,9 +2,14 @@ import customtkinter as ctk
 import tkinter as tk
 from tkinter import filedialog
 import os
-import threading
-import PyPDF2
+import queue
+from concurrent.futures import ThreadPoolExecutor
 from pdf_to_audio import PDFToAudioConverter, normalize_pdf_path
+from document_session import PDFDocumentSession
+from instrumentation import ProgressTracker
+
+# How often converter events are drained into the UI, in milliseconds
+EVENT_POLL_MS = 200
 
 class PDFAudiobookGUI:
     def __init__(self):
@@ -13,9 +18,27 @@ class PDFAudiobookGUI:
         self.app.title("PDF Audiobook Converter")
         self.app.geometry("800x600")
         self.current_theme = "dark"
+        self.session = None
+        self.preview_page = None
+        self.page_index = None
+        
+        self._converter = None
+        self.events = queue.Queue()
+        self.progress = ProgressTracker()
+        self.conversion_executor = ThreadPoolExecutor(max_workers=1)
+        self.conversion = None
+        self.index_executor = ThreadPoolExecutor(max_workers=1)
         
         self.setup_ui()
-        self.converter = PDFToAudioConverter()
+        
+    @property
+    def converter(self):
+        """Converter, created the first time a PDF is opened or converted"""
+        if self._converter is None:
+            self._converter = PDFToAudioConverter()
+            # Called from worker threads; Queue.put is thread-safe
+            self._converter.add_hook(self.events.put)
+        return self._converter
         
     def setup_ui(self):
         """Setup the main UI components"""
@@ -114,6 +137,15 @@ class PDFAudiobookGUI:
         self.end_page_entry.configure(state="disabled")
         self.preview_button.configure(state="disabled")
         
+        # Output mode
+        self.split_var = tk.BooleanVar(value=False)
+        self.split_checkbox = ctk.CTkCheckBox(
+            self.main_frame,
+            text="One audio file per chapter",
+            variable=self.split_var
+        )
+        self.split_checkbox.pack(anchor="w", padx=15, pady=5)
+        
         # Text preview
         self.preview_frame = ctk.CTkFrame(self.main_frame)
         self.preview_frame.pack(fill="both", expand=True, padx=10, pady=5)
@@ -141,13 +173,24 @@ class PDFAudiobookGUI:
         self.status_label = ctk.CTkLabel(self.progress_frame, text="")
         self.status_label.pack(pady=5)
         
-        # Convert button
+        # Convert and cancel buttons
+        self.button_frame = ctk.CTkFrame(self.main_frame, fg_color="transparent")
+        self.button_frame.pack(pady=10)
+        
         self.convert_button = ctk.CTkButton(
-            self.main_frame,
+            self.button_frame,
             text="Convert to Audio",
             command=self.start_conversion
         )
-        self.convert_button.pack(pady=10)
+        self.convert_button.pack(side="left", padx=5)
+        
+        self.cancel_button = ctk.CTkButton(
+            self.button_frame,
+            text="Cancel",
+            command=self.cancel_conversion,
+            state="disabled"
+        )
+        self.cancel_button.pack(side="left", padx=5)
         
     def toggle_theme(self):
         """Toggle between light and dark theme"""
@@ -181,11 +224,16 @@ class PDFAudiobookGUI:
             if not hasattr(self, 'total_pages'):
                 return None
                 
-            if 1 <= start <= end <= self.total_pages:
-                return (start, end)
-            else:
+            if not 1 <= start <= end <= self.total_pages:
                 self.show_error(f"Invalid page range. Please enter values between 1 and {self.total_pages}")
                 return None
+            # Once the PDF is indexed, ranges without any text are caught here
+            if self.page_index:
+                problem = self.page_index.check_range((start, end))
+                if problem:
+                    self.show_error(problem)
+                    return None
+            return (start, end)
         except ValueError:
             self.show_error("Please enter valid page numbers")
             return None
@@ -208,72 +256,136 @@ class PDFAudiobookGUI:
             self.current_file = file_path
             self.file_label.configure(text=os.path.basename(file_path))
             
-            try:
-                with open(file_path, 'rb') as file:
-                    pdf_reader = PyPDF2.PdfReader(file)
-                    self.total_pages = len(pdf_reader.pages)
-                    
-                    # Clear previous text
-                    self.preview_text.delete("1.0", "end")
-                    
-                    # Get first page text
-                    first_page = pdf_reader.pages[0].extract_text()
-                    if first_page.strip():
-                        self.preview_text.insert("1.0", first_page)
-                        self.show_status(f"PDF loaded successfully. Total pages: {self.total_pages}")
-                    else:
-                        self.preview_text.insert("1.0", "No readable text found in the first page.")
-                        self.show_status(f"PDF loaded. Total pages: {self.total_pages}. Warning: First page may be empty or contain images only.")
-                    
-                    self.preview_text.update()
-                    self.app.update_idletasks()
-                    
-            except Exception as e:
-                self.show_error(f"Error reading PDF: {str(e)}")
-                self.preview_text.delete("1.0", "end")
-                self.preview_text.insert("1.0", "Error loading preview.")
-                return
-                
+            # Replace the session of the previously selected file
+            if self.session:
+                self.session.close()
+            if hasattr(self, 'total_pages'):
+                del self.total_pages
+            self.page_index = None
+            session = self.session = PDFDocumentSession(file_path, self.converter.page_cache,
+                                                         extractor_for=self.converter.extractor_for)
+            
+            self.preview_text.delete("1.0", "end")
+            self.show_status("Loading PDF...")
+            self.when_done(session.ready, lambda future: self.on_document_ready(session, future))
+            
+    def on_document_ready(self, session, future):
+        """Show the first page once a newly selected PDF has been opened"""
+        if session is not self.session:
+            return
+        try:
+            self.total_pages = future.result()
+        except Exception as e:
+            self.show_error(f"Error reading PDF: {str(e)}")
+            self.preview_text.delete("1.0", "end")
+            self.preview_text.insert("1.0", "Error loading preview.")
+            return
+        self.request_preview(0, loaded=True)
+        
+        # Index the pages in the background for range checks and estimates
+        future = self.index_executor.submit(self.converter.page_index, session.pdf_path)
+        self.when_done(future, lambda future: self.on_index_ready(session, future))
+        
+    def on_index_ready(self, session, future):
+        """Keep the page index of the current PDF and show its summary"""
+        if session is not self.session:
+            return
+        try:
+            self.page_index = future.result()
+        except Exception as e:
+            print(f"Could not index the PDF: {str(e)}")
+            return
+        if self.conversion is None or self.conversion.done():
+            self.show_status(f"PDF indexed: {self.page_index.describe()}")
+            
+    def describe_preview(self, page_num):
+        """Chapter of a previewed page and the estimate for the entered range"""
+        if not self.page_index:
+            return ""
+        details = ""
+        chapter = self.page_index.page(page_num + 1)['chapter']
+        if chapter:
+            details += f" ({chapter})"
+        try:
+            page_range = (int(self.start_page_var.get()), int(self.end_page_var.get()))
+        except ValueError:
+            return details
+        if self.page_index.check_range(page_range) is None:
+            details += f"\nPages {page_range[0]}-{page_range[1]}: {self.page_index.describe(page_range)}"
+        return details
+        
     def update_preview(self):
         """Update preview based on current page selection"""
-        if not hasattr(self, 'current_file'):
+        if not hasattr(self, 'current_file') or not hasattr(self, 'total_pages'):
             return
             
-        try:
-            with open(self.current_file, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                
-                if self.page_selection_var.get() == "specific":
-                    try:
-                        start_page = int(self.start_page_var.get())
-                        if 1 <= start_page <= len(pdf_reader.pages):
-                            page_num = start_page - 1
-                        else:
-                            self.show_error(f"Invalid page number. Please enter a number between 1 and {len(pdf_reader.pages)}")
-                            return
-                    except ValueError:
-                        self.show_error("Please enter a valid page number")
-                        return
-                else:
-                    page_num = 0
-                
-                self.preview_text.delete("1.0", "end")
-                page_text = pdf_reader.pages[page_num].extract_text()
-                
-                if page_text.strip():
-                    self.preview_text.insert("1.0", page_text)
-                    self.show_status(f"Showing preview of page {page_num + 1}")
+        if self.page_selection_var.get() == "specific":
+            try:
+                start_page = int(self.start_page_var.get())
+                if 1 <= start_page <= self.total_pages:
+                    page_num = start_page - 1
                 else:
-                    self.preview_text.insert("1.0", f"No readable text found on page {page_num + 1}")
-                    self.show_status(f"Warning: Page {page_num + 1} may be empty or contain images only")
-                
-                self.preview_text.update()
-                self.app.update_idletasks()
-                
+                    self.show_error(f"Invalid page number. Please enter a number between 1 and {self.total_pages}")
+                    return
+            except ValueError:
+                self.show_error("Please enter a valid page number")
+                return
+        else:
+            page_num = 0
+        
+        # Pages the index knows to be empty aren't loaded at all
+        if self.page_index and self.page_index.page(page_num + 1)['empty']:
+            self.preview_page = page_num
+            kind = "an image-only page" if self.page_index.page(page_num + 1)['image_only'] else "empty"
+            self.preview_text.delete("1.0", "end")
+            self.preview_text.insert("1.0", f"No readable text found on page {page_num + 1}")
+            self.show_status(f"Page {page_num + 1} is {kind}{self.describe_preview(page_num)}")
+            return
+            
+        self.request_preview(page_num)
+        
+    def request_preview(self, page_num, loaded=False):
+        """Fetch a page from the document session and show it when ready"""
+        session = self.session
+        self.preview_page = page_num
+        future = session.get_page(page_num)
+        if not future.done():
+            self.show_status(f"Loading page {page_num + 1}...")
+        self.when_done(future, lambda future: self.show_preview(session, page_num, future, loaded))
+        
+    def show_preview(self, session, page_num, future, loaded=False):
+        """Show the text of a page, unless a newer preview was requested"""
+        if session is not self.session or page_num != self.preview_page:
+            return
+            
+        self.preview_text.delete("1.0", "end")
+        try:
+            page_text = future.result()
         except Exception as e:
             self.show_error(f"Error updating preview: {str(e)}")
-            self.preview_text.delete("1.0", "end")
             self.preview_text.insert("1.0", "Error loading preview")
+            return
+            
+        if page_text.strip():
+            self.preview_text.insert("1.0", page_text)
+            if loaded:
+                self.show_status(f"PDF loaded successfully. Total pages: {self.total_pages}")
+            else:
+                self.show_status(f"Showing preview of page {page_num + 1}{self.describe_preview(page_num)}")
+        else:
+            if loaded:
+                self.preview_text.insert("1.0", "No readable text found in the first page.")
+                self.show_status(f"PDF loaded. Total pages: {self.total_pages}. Warning: First page may be empty or contain images only.")
+            else:
+                self.preview_text.insert("1.0", f"No readable text found on page {page_num + 1}")
+                self.show_status(f"Warning: Page {page_num + 1} may be empty or contain images only")
+        
+    def when_done(self, future, callback):
+        """Call callback(future) on the Tk main loop once the future is done"""
+        if future.done():
+            callback(future)
+        else:
+            self.app.after(25, lambda: self.when_done(future, callback))
             
     def start_conversion(self):
         """Start the conversion process in a separate thread"""
@@ -286,68 +398,83 @@ class PDFAudiobookGUI:
             return
             
         self.convert_button.configure(state="disabled")
+        self.cancel_button.configure(state="normal")
+        self.progress_bar.set(0)
+        self.show_status("Converting PDF to audiobook...")
+        
+        # The conversion runs on a worker thread and only reports through
+        # self.events; all widget updates happen here on the Tk main loop
+        self.progress.reset()
+        if self.split_var.get():
+            self.conversion = self.conversion_executor.submit(
+                self.converter.convert_pdf_to_chapters, self.current_file, page_range=page_range)
+        else:
+            self.conversion = self.conversion_executor.submit(
+                self.converter.convert_pdf_to_audiobook, self.current_file, page_range=page_range)
+        split = self.split_var.get()
+        self.poll_events()
+        self.when_done(self.conversion, lambda future: self.on_conversion_done(future, split))
         
-        def conversion_thread():
+    def cancel_conversion(self):
+        """Ask the running conversion to stop"""
+        self.converter.cancel()
+        self.cancel_button.configure(state="disabled")
+        self.show_status("Cancelling...")
+        
+    def drain_events(self):
+        """Feed all queued converter events to the progress tracker"""
+        updated = False
+        while True:
             try:
-                self.show_status("Converting PDF to audiobook...")
-                self.progress_bar.set(0)
-                self.app.update()
-                
-                output_dir = "audio_output"
-                os.makedirs(output_dir, exist_ok=True)
-                
-                base_name = os.path.splitext(os.path.basename(self.current_file))[0]
-                if page_range:
-                    output_path = os.path.join(output_dir, f"{base_name}_pages_{page_range[0]}-{page_range[1]}.mp3")
-                else:
-                    output_path = os.path.join(output_dir, f"{base_name}.mp3")
-                
-                self.show_status("Extracting text from PDF...")
-                text = self.converter.extract_text_from_pdf(self.current_file, page_range=page_range)
-                if not text.strip():
-                    raise Exception("No text could be extracted from the PDF")
-                self.progress_bar.set(0.4)
-                self.app.update()
-                
-                self.show_status("Processing text...")
-                processed_text = self.converter.preprocess_text(text)
-                if not processed_text.strip():
-                    raise Exception("Text processing resulted in empty content")
-                self.progress_bar.set(0.6)
-                self.app.update()
-                
-                language = self.converter.detect_language(processed_text)
-                self.show_status(f"Converting to audio (Language: {language})...")
-                self.progress_bar.set(0.7)
-                self.app.update()
-                
-                self.show_status("Attempting online conversion...")
-                success = self.converter.convert_to_audio(processed_text, output_path, language)
-                
-                if not success:
-                    self.show_status("Online conversion failed. Trying offline conversion...")
-                    self.app.update()
-                    success = self.converter.convert_to_audio(processed_text, output_path, language, use_offline=True)
-                
-                if success:
-                    self.progress_bar.set(1.0)
-                    self.show_status(f"Conversion complete! Audio saved to: {output_path}")
-                else:
-                    raise Exception("Both online and offline conversion methods failed")
-                
-            except Exception as e:
-                error_msg = str(e)
-                print(f"Conversion error: {error_msg}")
-                self.show_error(f"Error during conversion: {error_msg}")
-                self.progress_bar.set(0)
-            finally:
-                self.convert_button.configure(state="normal")
-                self.app.update()
-                
-        threading.Thread(target=conversion_thread, daemon=True).start()
+                event = self.events.get_nowait()
+            except queue.Empty:
+                return updated
+            self.progress.update(event)
+            updated = True
+            
+    def poll_events(self):
+        """
+        Drain the converter's events in one batch and redraw the progress
+        once, then check again shortly while the conversion is running.
+        """
+        if self.conversion is None or self.conversion.done():
+            return
+        if self.drain_events() and not self.converter.cancelled:
+            self.progress_bar.set(self.progress.fraction)
+            self.show_status(self.progress.describe())
+        self.app.after(EVENT_POLL_MS, self.poll_events)
+        
+    def on_conversion_done(self, future, split=False):
+        """Report the outcome of a conversion"""
+        self.drain_events()
+        self.convert_button.configure(state="normal")
+        self.cancel_button.configure(state="disabled")
+        try:
+            output = future.result()
+        except Exception as e:
+            output = None
+            print(f"Conversion error: {str(e)}")
+        
+        if self.converter.cancelled:
+            self.progress_bar.set(0)
+            self.show_status("Conversion cancelled. Converting again resumes where it stopped.")
+        elif output:
+            self.progress_bar.set(1.0)
+            location = os.path.dirname(output) if split else output
+            self.show_status(f"Conversion complete! Audio saved to: {location}\n{self.converter.profiler.summary()}")
+        else:
+            self.progress_bar.set(0)
+            self.show_error("Conversion failed; see the console for details")
+        
+    def on_close(self):
+        """Stop a running conversion before closing the window"""
+        if self.conversion is not None and not self.conversion.done():
+            self.converter.cancel()
+        self.app.destroy()
         
     def run(self):
         """Start the GUI application"""
+        self.app.protocol("WM_DELETE_WINDOW", self.on_close)
         self.app.mainloop()
 
 if __name__ == "__main__":
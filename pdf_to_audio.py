@@ -1,11 +1,48 @@
 import os
-import PyPDF2
-from gtts import gTTS
-import pyttsx3
-from langdetect import detect
-import nltk
-from tqdm import tqdm
+import sys
 import time
+import queue
+import threading
+from itertools import chain
+from contextlib import ExitStack, nullcontext
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from synthesis import SynthesisEngine, HTTPTTSBackend, OfflineSynthesisPool
+from async_synthesis import AsyncTTSClient
+from page_cache import PageTextCache, file_hash, text_key
+from extractors import available_extractors, calibrate, open_extractor
+from audio_cache import AudioChunkCache, ConversionCheckpoint, OutputManifest, PreviousOutput, chunk_key
+from audio_writer import MP3SegmentWriter
+from text_cleaning import TextCleaner, sent_tokenize
+from chunking import TextChunker, chunk_limit
+from instrumentation import ConversionProfiler
+from page_index import PageIndex
+from chapters import (DEFAULT_PAGES_PER_PART, read_outline, plan_chapters, chapter_filename,
+                      load_chapter_index, write_chapter_index, write_playlist)
+
+# Below this many pages the cost of starting worker processes outweighs
+# the gain from extracting in parallel
+PARALLEL_EXTRACTION_MIN_PAGES = 32
+
+# Largest slice of pages handed to one extraction worker at a time
+EXTRACTION_SLICE_MAX_PAGES = 16
+
+# Maximum number of items buffered between two pipeline stages
+PIPELINE_QUEUE_SIZE = 8
+
+# Amount of text sampled for detecting the language of a whole text
+LANGUAGE_SAMPLE_CHARS = 2000
+
+# Amount of text sampled for the language of a single chunk, and the
+# minimum a chunk needs before its own guess is trusted
+SEGMENT_SAMPLE_CHARS = 500
+SEGMENT_MIN_CHARS = 100
+
+# Minimum langdetect probability for a chunk to switch language
+SEGMENT_MIN_CONFIDENCE = 0.9
+
+_langdetect_lock = threading.Lock()
+_detect_langs = None
 
 def normalize_pdf_path(path):
     """
@@ -31,88 +68,660 @@ def normalize_pdf_path(path):
     
     return normalized_path
 
-class PDFToAudioConverter:
-    def __init__(self):
-        # Download necessary NLTK data
+def resolve_page_range(total_pages, page_range=None):
+    """
+    Turn an optional 1-based (start_page, end_page) tuple into a range of
+    0-based page indices, clamped to the document.
+    
+    Args:
+        total_pages (int): Number of pages in the PDF
+        page_range (tuple): Optional tuple of (start_page, end_page)
+    Returns:
+        range: 0-based page indices to process
+    """
+    if page_range:
+        start_page = max(0, page_range[0] - 1)  # Convert to 0-based index
+        end_page = min(total_pages, page_range[1])
+        return range(start_page, end_page)
+    return range(total_pages)
+
+def detect_langs(text):
+    """
+    Return langdetect's language guesses for a text, most likely first.
+    langdetect is loaded on the first call (its profiles take a while to
+    read) and seeded so results are repeatable.
+    """
+    global _detect_langs
+    if _detect_langs is None:
+        with _langdetect_lock:
+            if _detect_langs is None:
+                from langdetect import detect_langs as langdetect_detect_langs, DetectorFactory
+                DetectorFactory.seed = 0
+                _detect_langs = langdetect_detect_langs
+    return _detect_langs(text)
+
+def tqdm(*args, **kwargs):
+    """Progress bar from tqdm, imported on first use."""
+    from tqdm import tqdm as tqdm_bar
+    return tqdm_bar(*args, **kwargs)
+
+def sample_text(text, max_chars, windows=8):
+    """
+    Return a bounded sample of a text made of evenly spaced windows, so
+    language detection costs the same for a page and for a whole book.
+    
+    Args:
+        text (str): Text to sample
+        max_chars (int): Maximum length of the sample
+        windows (int): Number of windows taken across the text
+    Returns:
+        str: The text itself if short enough, otherwise the joined windows
+    """
+    if len(text) <= max_chars:
+        return text
+    window = (max_chars - (windows - 1)) // windows  # Leave room for the separators
+    step = (len(text) - window) / (windows - 1)
+    return ' '.join(text[int(i * step):int(i * step) + window] for i in range(windows))
+
+def _measure_page(page):
+    """Counts of one extracted (page_num, text) item for the profiler."""
+    return {'pages': 1, 'chars': len(page[1])}
+
+def _extract_pages_worker(pdf_path, page_numbers, extractor):
+    """
+    Extract the text of a slice of pages. Runs in a worker process, so it
+    opens the PDF itself instead of sharing a document across processes.
+    
+    Args:
+        pdf_path (str): Path to the PDF file
+        page_numbers (list): 0-based page indices to extract
+        extractor (str): Name of the extraction backend
+    Returns:
+        list: (page_num, text) tuples in the order given
+    """
+    with open_extractor(extractor, pdf_path) as document:
+        return [(page_num, document.extract(page_num)) for page_num in page_numbers]
+
+class _StageError:
+    """Wraps an exception raised inside a pipeline stage thread."""
+    def __init__(self, error):
+        self.error = error
+
+_STAGE_DONE = object()
+
+class ConversionCancelled(Exception):
+    """Raised inside a conversion once PDFToAudioConverter.cancel() was called."""
+
+def run_pipeline_stage(iterable, maxsize=PIPELINE_QUEUE_SIZE):
+    """
+    Drain an iterable on a background thread into a bounded queue and yield
+    its items in order. The producer blocks once the queue is full, so a
+    slow consumer keeps memory flat, while a fast one never waits for more
+    than one item.
+    
+    Args:
+        iterable: Stage to run in the background (usually a generator)
+        maxsize (int): Maximum number of items buffered between the stages
+    Yields:
+        The items of the iterable; exceptions are re-raised in the consumer
+    """
+    items = queue.Queue(maxsize=maxsize)
+    stopped = threading.Event()
+    
+    def put(item):
+        while not stopped.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def produce():
         try:
-            nltk.data.find('tokenizers/punkt')
-        except LookupError:
-            nltk.download('punkt')
+            for item in iterable:
+                if not put(item):
+                    break
+        except BaseException as e:
+            put(_StageError(e))
+        else:
+            put(_STAGE_DONE)
+        finally:
+            close = getattr(iterable, 'close', None)
+            if close:
+                close()
+    
+    threading.Thread(target=produce, daemon=True).start()
+    try:
+        while True:
+            item = items.get()
+            if item is _STAGE_DONE:
+                return
+            if isinstance(item, _StageError):
+                raise item.error
+            yield item
+    finally:
+        # Unblock the producer if the consumer stopped early
+        stopped.set()
+
+class PDFToAudioConverter:
+    def __init__(self, extraction_workers=None, synthesis_workers=4, tts_endpoint=None,
+                 page_cache=None, audio_cache=None, offline_workers=None, async_synthesis=False,
+                 rate_limit=None, extractor="auto"):
+        """
+        Args:
+            extraction_workers (int): Number of processes used for page
+                extraction. Defaults to the number of CPUs; 1 disables
+                parallel extraction.
+            synthesis_workers (int): Number of chunks synthesized concurrently
+            tts_endpoint (str): Optional URL of an HTTP TTS endpoint to use
+                instead of gTTS, e.g. a local stand-in server
+            page_cache (PageTextCache): Cache of extracted page text.
+                Defaults to the shared on-disk cache.
+            audio_cache (AudioChunkCache): Cache of synthesized audio chunks.
+                Defaults to the shared on-disk cache.
+            offline_workers (int): Number of processes running offline
+                pyttsx3 engines. Defaults to the number of CPUs.
+            async_synthesis (bool): Synthesize online with the asyncio
+                client (pooled connections, adaptive concurrency); requires
+                aiohttp. synthesis_workers is then the upper bound on
+                concurrent requests.
+            rate_limit (float): With async_synthesis, maximum TTS requests
+                per second per host
+            extractor (str): Text extraction backend (see extractors), or
+                "auto" to calibrate the installed ones on every new PDF
+                and use the fastest one that extracts usable text
+        """
+        self.extraction_workers = extraction_workers or os.cpu_count() or 1
+        self.page_cache = page_cache or PageTextCache()
+        self.extractor = extractor
+        self._extractor_lock = threading.Lock()
+        self.text_cleaner = TextCleaner()
+        self.offline_pool = OfflineSynthesisPool(offline_workers)
         
-        # Initialize offline TTS engine as backup
-        self.offline_engine = pyttsx3.init()
+        if async_synthesis:
+            backend = AsyncTTSClient(tts_endpoint, max_concurrency=synthesis_workers, rate_limit=rate_limit)
+        else:
+            backend = HTTPTTSBackend(tts_endpoint) if tts_endpoint else None
+        self.synthesis_engine = SynthesisEngine(backend, workers=synthesis_workers,
+                                                cache=audio_cache or AudioChunkCache())
         
-    def extract_text_from_pdf(self, pdf_path, page_range=None):
+        # Instrumentation of the conversion in progress; see start_profile
+        self.hooks = []
+        self.profiler = None
+        self.last_profile = None
+        self.synthesis_engine.chunk_hooks.append(self._record_chunk)
+        self.offline_pool.chunk_hooks.append(self._record_chunk)
+        
+        self._cancel = threading.Event()
+        self._page_indexes = {}
+        
+    def cancel(self):
+        """
+        Ask the running conversion to stop. It stops between pages and
+        between chunks, shuts its workers down and returns None; the
+        chunks already written are checkpointed, so running the same
+        conversion again resumes after them.
+        """
+        self._cancel.set()
+
+    @property
+    def cancelled(self):
+        """Whether the current conversion was asked to stop."""
+        return self._cancel.is_set()
+
+    def _cancellable(self, iterable):
+        """Pass items through, stopping with ConversionCancelled once cancelled."""
+        for item in iterable:
+            if self._cancel.is_set():
+                raise ConversionCancelled("Conversion cancelled")
+            yield item
+
+    def add_hook(self, callback):
+        """
+        Register a callback receiving the instrumentation events of every
+        conversion (stage progress, synthesized chunks and the final
+        report); see ConversionProfiler for the event format.
+        """
+        self.hooks.append(callback)
+
+    def start_profile(self):
+        """
+        Start collecting per-stage timings, memory and throughput. Every
+        stage method run afterwards records into the returned profiler.
+        convert_pdf_to_audiobook calls this itself.
+        
+        Returns:
+            ConversionProfiler: The new profiler
+        """
+        self.profiler = ConversionProfiler(self.hooks)
+        return self.profiler
+
+    def _record_chunk(self, **chunk_stats):
+        if self.profiler:
+            self.profiler.record_chunk(**chunk_stats)
+
+    def _profile_stage(self, stage, **counts):
+        """Time a block of work as part of a stage if a profile is running."""
+        return self.profiler.stage(stage, **counts) if self.profiler else nullcontext()
+
+    def _track(self, stage, iterable, measure):
+        """Time the items of a pipeline stage if a profile is running."""
+        return self.profiler.track(stage, iterable, measure) if self.profiler else iterable
+
+    def extractor_for(self, pdf_path):
+        """
+        Return the name of the text extraction backend used for a PDF. With
+        extractor="auto", the installed backends are calibrated on a
+        sample of pages the first time a PDF is seen and the choice is
+        remembered in the page cache.
+        """
+        if self.extractor != "auto":
+            return self.extractor
+        doc_hash = file_hash(pdf_path)
+        with self._extractor_lock:
+            extractor = self.page_cache.get_extractor(doc_hash)
+            installed = available_extractors()
+            if extractor not in installed:
+                if len(installed) == 1:
+                    extractor = installed[0]
+                else:
+                    extractor, results = calibrate(pdf_path)
+                    timings = ", ".join(f"{name} {result['seconds']:.2f}s" for name, result in results.items()
+                                        if result['usable'])
+                    print(f"Text extractor: {extractor} (usable: {timings or 'none'})")
+                self.page_cache.put_extractor(doc_hash, extractor)
+        return extractor
+
+    def page_index(self, pdf_path, build=True):
+        """
+        Return the page index of a PDF (see PageIndex), building and saving
+        it with one pass over the pages the first time. The pass fills the
+        page cache too, so a conversion afterwards doesn't parse the pages
+        again.
+        
+        Args:
+            pdf_path (str): Path to the PDF file
+            build (bool): Build the index if it doesn't exist yet
+        Returns:
+            PageIndex: The index, or None if it doesn't exist and build is False
+        """
+        doc_hash = file_hash(pdf_path)
+        # Backends differ in what they extract, so each has its own index
+        key = text_key(doc_hash, self.extractor_for(pdf_path))
+        index = self._page_indexes.get(key)
+        if index is None:
+            index_path = PageIndex.path_for(self.page_cache.cache_dir, key)
+            index = PageIndex.load(index_path)
+            if index is None and build:
+                pages = tqdm(self.iter_page_texts(pdf_path), desc="Indexing pages", unit="page")
+                index = PageIndex.build(pdf_path, doc_hash, pages)
+                index.save(index_path)
+            if index is not None:
+                self._page_indexes[key] = index
+        return index
+
+    def extract_text_from_pdf(self, pdf_path, page_range=None, workers=None):
         """
         Extract text from PDF file with proper handling of formatting.
         
         Args:
             pdf_path (str): Path to the PDF file
             page_range (tuple): Optional tuple of (start_page, end_page) for specific pages
+            workers (int): Optional override of the number of extraction processes
         """
-        text = ""
         try:
-            with open(pdf_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                total_pages = len(pdf_reader.pages)
-                
-                # Determine page range
-                if page_range:
-                    start_page = max(0, page_range[0] - 1)  # Convert to 0-based index
-                    end_page = min(total_pages, page_range[1])
-                    pages_to_process = range(start_page, end_page)
-                else:
-                    pages_to_process = range(total_pages)
-                
-                for page_num in tqdm(pages_to_process, desc="Extracting text"):
-                    text += pdf_reader.pages[page_num].extract_text() + "\n"
-            return text
+            pages = self._track('extraction', self.iter_page_texts(pdf_path, page_range, workers), _measure_page)
+            page_texts = [page_text for _, page_text in tqdm(pages, desc="Extracting text")]
+            return "".join(page_text + "\n" for page_text in page_texts)
         except Exception as e:
             raise Exception(f"Error reading PDF: {str(e)}")
 
+    def iter_page_texts(self, pdf_path, page_range=None, workers=None):
+        """
+        Yield the text of each page in the range, in page order, without
+        holding more than a few pages in memory. Pages found in the page
+        cache are not parsed again; newly extracted pages are added to it.
+        If the PDF has a page index, the pages it lists as empty are yielded
+        as empty text without being parsed.
+        
+        Args:
+            pdf_path (str): Path to the PDF file
+            page_range (tuple): Optional tuple of (start_page, end_page) for specific pages
+            workers (int): Optional override of the number of extraction processes
+        Yields:
+            tuple: (page_num, text) with a 0-based page_num
+        """
+        extractor = self.extractor_for(pdf_path)
+        key = text_key(file_hash(pdf_path), extractor)
+        total_pages = self.page_cache.page_count(pdf_path, extractor)
+        pages_to_process = resolve_page_range(total_pages, page_range)
+        
+        index = self.page_index(pdf_path, build=False)
+        empty_pages = {page - 1 for page in index.empty_pages()} if index else set()
+        cached_pages = self.page_cache.cached_pages(key)
+        missing_pages = [page_num for page_num in pages_to_process
+                         if page_num not in cached_pages and page_num not in empty_pages]
+        
+        with ExitStack() as stack:
+            document = None
+            
+            def extract_page(page_num):
+                # Only open the PDF once a page isn't in the cache
+                nonlocal document
+                if document is None:
+                    document = stack.enter_context(open_extractor(extractor, pdf_path))
+                return document.extract(page_num)
+            
+            workers = min(workers or self.extraction_workers, len(missing_pages))
+            if workers > 1 and len(missing_pages) >= PARALLEL_EXTRACTION_MIN_PAGES:
+                extracted = self._iter_pages_parallel(pdf_path, missing_pages, workers, extractor)
+            else:
+                extracted = ((page_num, extract_page(page_num)) for page_num in missing_pages)
+            
+            for page_num in pages_to_process:
+                if page_num in empty_pages:
+                    yield page_num, ""
+                    continue
+                if page_num in cached_pages:
+                    page_text = self.page_cache.get(key, page_num)
+                    if page_text is not None:
+                        yield page_num, page_text
+                        continue
+                    # Evicted since the lookup above
+                    page_text = extract_page(page_num)
+                else:
+                    _, page_text = next(extracted)
+                self.page_cache.put(key, page_num, page_text)
+                yield page_num, page_text
+
+    def _iter_pages_parallel(self, pdf_path, pages_to_process, workers, extractor):
+        """
+        Split the page range into contiguous slices and extract them on a
+        process pool, yielding the pages in page order. At most two slices
+        per worker are in flight, so extracted text doesn't pile up ahead
+        of a slower consumer.
+        """
+        # Several slices per worker so a few heavy pages don't leave the
+        # other processes idle at the end
+        slice_size = max(1, min(EXTRACTION_SLICE_MAX_PAGES, len(pages_to_process) // (workers * 4)))
+        slices = (list(pages_to_process[i:i + slice_size])
+                  for i in range(0, len(pages_to_process), slice_size))
+        
+        pending = deque()
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            try:
+                for pages in slices:
+                    pending.append(executor.submit(_extract_pages_worker, pdf_path, pages, extractor))
+                    while len(pending) >= workers * 2:
+                        yield from pending.popleft().result()
+                while pending:
+                    yield from pending.popleft().result()
+            finally:
+                # Drop the slices not started yet if the consumer stopped early
+                for future in pending:
+                    future.cancel()
+
     def preprocess_text(self, text):
         """Clean and preprocess text for better audio conversion."""
-        # Remove excessive whitespace
-        text = ' '.join(text.split())
+        with self._profile_stage('preprocessing', chars=len(text)):
+            # Remove excessive whitespace
+            text = ' '.join(text.split())
+            
+            # Split into sentences for better pacing
+            sentences = sent_tokenize(text)
+            
+            # Join sentences with proper spacing
+            processed_text = ' '.join(sentences)
+        return processed_text
+
+    def iter_sentences(self, page_texts):
+        """
+        Clean page texts one page at a time and yield complete sentences.
+        Running headers, footers and page numbers are dropped and
+        hyphenated words are re-joined; see TextCleaner.
         
-        # Split into sentences for better pacing
-        sentences = nltk.sent_tokenize(text)
+        Args:
+            page_texts: Iterable of (page_num, text) tuples
+        Yields:
+            str: Cleaned sentences in reading order
+        """
+        return self.text_cleaner.iter_sentences(page_texts)
+
+    def iter_audio_chunks(self, pdf_path, page_range=None, chunker=None):
+        """
+        Build the streaming text pipeline: pages -> cleaned sentences ->
+        synthesis-sized chunks. Extraction and cleaning run on background
+        threads behind bounded queues, so the first chunk is available as
+        soon as its pages are extracted. Chunks don't span pages; see
+        TextChunker.chunk_pages.
         
-        # Join sentences with proper spacing
-        processed_text = ' '.join(sentences)
-        return processed_text
+        Args:
+            pdf_path (str): Path to the PDF file
+            page_range (tuple): Optional tuple of (start_page, end_page) for specific pages
+            chunker (TextChunker): Chunker to use, whose index then records
+                the chunks; defaults to one sized for the online backend
+        Yields:
+            PageChunk: Chunks of processed text, tagged with their page
+        """
+        pages = run_pipeline_stage(self._cancellable(
+            self._track('extraction', self.iter_page_texts(pdf_path, page_range), _measure_page)))
+        page_sentences = run_pipeline_stage(
+            self._track('preprocessing', self.text_cleaner.iter_page_sentences(pages),
+                        lambda page: {'chars': sum(len(sentence) for sentence in page[1])}))
+        chunker = chunker or TextChunker(chunk_limit(self.synthesis_engine.backend))
+        return chunker.chunk_pages(page_sentences)
 
     def detect_language(self, text):
-        """Detect the language of the text."""
-        try:
-            return detect(text)
-        except:
-            return 'en'  # Default to English if detection fails
+        """Detect the language of the text from a bounded sample of it."""
+        sample = sample_text(text, LANGUAGE_SAMPLE_CHARS)
+        with self._profile_stage('detection', chars=len(sample)):
+            try:
+                return detect_langs(sample)[0].lang
+            except:
+                return 'en'  # Default to English if detection fails
+
+    def detect_segment_language(self, text, fallback):
+        """
+        Detect the language of one chunk or chapter. Segments too short or
+        too ambiguous for a confident guess keep the fallback language.
+        
+        Args:
+            text (str): Segment text
+            fallback (str): Language to use when detection isn't confident
+        Returns:
+            str: Language code
+        """
+        sample = sample_text(text, SEGMENT_SAMPLE_CHARS)
+        if len(sample.strip()) < SEGMENT_MIN_CHARS:
+            return fallback
+        with self._profile_stage('detection', chars=len(sample)):
+            try:
+                best = detect_langs(sample)[0]
+            except:
+                return fallback
+        return best.lang if best.prob >= SEGMENT_MIN_CONFIDENCE else fallback
+
+    def iter_language_tags(self, chunks, language='en'):
+        """
+        Tag every chunk with its own language so bilingual books are read
+        with the right voice throughout. Chunks without a confident guess
+        continue in the language of the chunk before them.
+        
+        Args:
+            chunks: Iterable of text chunks
+            language (str): Language of the document, used until the
+                first confident detection
+        Yields:
+            tuple: (chunk, language)
+        """
+        for chunk in chunks:
+            language = self.detect_segment_language(chunk, language)
+            yield chunk, language
 
     def convert_to_audio(self, text, output_path, language='en', use_offline=False):
         """Convert text to audio using either gTTS (online) or pyttsx3 (offline)."""
         try:
+            # Chunked on sentence boundaries for either engine
             if not use_offline:
-                # Online conversion using gTTS
-                tts = gTTS(text=text, lang=language, slow=False)
-                tts.save(output_path)
+                chunker = TextChunker(chunk_limit(self.synthesis_engine.backend))
+                return self.stream_to_audio(chunker.chunk_text(text), output_path, language, chunker.index)
             else:
-                # Offline conversion using pyttsx3
-                self.offline_engine.save_to_file(text, output_path)
-                self.offline_engine.runAndWait()
+                chunker = TextChunker(chunk_limit(self.offline_pool))
+                return self.stream_to_offline_audio(chunker.chunk_text(text), output_path)
+        except Exception as e:
+            print(f"Error in conversion: {str(e)}")
+            return False
+
+    def stream_to_audio(self, chunks, output_path, language='en', chunk_index=None):
+        """
+        Synthesize chunks concurrently and append the audio segments to the
+        output file in chunk order as they complete, in a single sequential
+        write pass with memory bounded by the synthesis window.
+        
+        Each chunk is synthesized in its own detected language, with
+        `language` used where detection isn't confident.
+        
+        Progress is checkpointed next to the output file after every chunk.
+        If a previous run of the same job was interrupted, the chunks it
+        finished are kept and synthesis resumes after the last of them.
+        
+        A finished output is described by a manifest (see OutputManifest).
+        When the same output is written again, for a revised edition of
+        the PDF say, the old file is moved aside and the audio of every
+        unchanged chunk is copied from it, so only changed pages are sent
+        to the TTS backend.
+        
+        Args:
+            chunks: Iterable of text chunks
+            output_path (str): Path of the MP3 file to write
+            language (str): Language of the document
+            chunk_index (ChunkIndex): Index the chunks are recorded in
+                (see TextChunker), saved with the output's manifest
+        Returns:
+            bool: True if every chunk was synthesized and written
+        """
+        backend = self.synthesis_engine.backend.name
+        checkpoint = ConversionCheckpoint(output_path, language, backend)
+        if not checkpoint.entries:
+            # A finished earlier version of the output becomes the source
+            # of the chunks that didn't change
+            PreviousOutput.retire(output_path)
+        previous = PreviousOutput(output_path, self.synthesis_engine.cache)
+        manifest = OutputManifest()
+        completed = False
+        try:
+            # Skip the chunks a previous run already wrote to the output
+            tagged_chunks = self.iter_language_tags(chunks, language)
+            resumed = resumed_chars = 0
+            remaining = iter(())
+            for chunk, chunk_language in tagged_chunks:
+                key = chunk_key(chunk, chunk_language, backend)
+                if resumed < len(checkpoint.entries) and checkpoint.entries[resumed]['key'] == key:
+                    start = checkpoint.entries[resumed - 1]['offset'] if resumed else 0
+                    manifest.add(key, chunk, getattr(chunk, 'page', None), start,
+                                 checkpoint.entries[resumed]['offset'])
+                    resumed += 1
+                    resumed_chars += len(chunk)
+                else:
+                    remaining = chain([(chunk, chunk_language)], tagged_chunks)
+                    break
+            if resumed:
+                print(f"Resuming after {resumed} finished chunks...")
+                if self.profiler:
+                    self.profiler.record_resumed(resumed, resumed_chars)
+            
+            # Keys and text of the chunks handed to the engine, in order
+            pending = deque()
+            def keyed(tagged_chunks):
+                for chunk, chunk_language in tagged_chunks:
+                    pending.append((chunk_key(chunk, chunk_language, backend), chunk))
+                    yield chunk, chunk_language
+            
+            offset = checkpoint.start(resumed)
+            if self.profiler:
+                self.profiler.begin('synthesis')
+            # Chapters may share the engine, so its last_stats may be another one's
+            stats = {}
+            with MP3SegmentWriter(output_path, offset) as writer:
+                segments = self.synthesis_engine.synthesize_tagged_chunks(keyed(remaining), cache=previous,
+                                                                          stats=stats)
+                for segment in self._cancellable(tqdm(segments, desc="Converting to audio", unit="chunk")):
+                    key, chunk = pending.popleft()
+                    start, offset = offset, writer.append(segment)
+                    checkpoint.record(key, offset)
+                    manifest.add(key, chunk, getattr(chunk, 'page', None), start, offset)
+            manifest.chunk_index = chunk_index
+            manifest.save(OutputManifest.path_for(output_path))
+            completed = True
+            
+            print(f"Synthesized {stats['chunks']} chunks ({stats['cached_chunks']} from cache) "
+                  f"in {stats['seconds']:.1f}s ({stats['chunks_per_second']:.2f} chunks/sec)")
+            if previous.manifest:
+                changed = manifest.changed_pages(previous.manifest)
+                print(f"Updated the previous version: {len(changed)} of {len(manifest.pages)} page(s) changed, "
+                      f"{previous.hits} chunk(s) reused")
+            previous.discard()
             return True
+        except ConversionCancelled:
+            print("Conversion cancelled.")
+            return False
         except Exception as e:
             print(f"Error in conversion: {str(e)}")
             return False
+        finally:
+            checkpoint.close(completed)
 
-    def convert_pdf_to_audiobook(self, pdf_path, output_dir="audio_output", page_range=None):
+    def stream_to_offline_audio(self, chunks, output_path):
+        """
+        Synthesize chunks with the offline pyttsx3 worker pool and merge
+        the segments into the output file in chunk order.
+        
+        Args:
+            chunks: Iterable of text chunks
+            output_path (str): Path of the audio file to write
+        Returns:
+            bool: True if every chunk was synthesized and written
+        """
+        try:
+            # The WAV output won't match the manifest or checkpoint of an
+            # earlier MP3
+            stale_paths = (OutputManifest.path_for(output_path), ConversionCheckpoint.path_for(output_path))
+            for stale_path in stale_paths:
+                if os.path.exists(stale_path):
+                    os.remove(stale_path)
+            if self.profiler:
+                self.profiler.begin('synthesis')
+            stats = self.offline_pool.synthesize_to_file(self._cancellable(chunks), output_path)
+            # An earlier version moved aside by a failed online run is of no
+            # further use
+            PreviousOutput(output_path).discard()
+            print(f"Synthesized {stats['chunks']} chunks offline in {stats['seconds']:.1f}s "
+                  f"({stats['chunks_per_second']:.2f} chunks/sec)")
+            return True
+        except ConversionCancelled:
+            print("Conversion cancelled.")
+            return False
+        except Exception as e:
+            print(f"Error in conversion: {str(e)}")
+            return False
+
+    def convert_pdf_to_audiobook(self, pdf_path, output_dir="audio_output", page_range=None, engine="auto"):
         """
         Main method to convert PDF to audiobook.
         
+        Text is streamed from the PDF through cleaning and chunking into
+        the TTS backend, so synthesis starts while later pages are still
+        being extracted and memory does not grow with the size of the book.
+        
         Args:
             pdf_path (str): Path to the PDF file
             output_dir (str): Directory to save the audio file
             page_range (tuple): Optional tuple of (start_page, end_page) for specific pages
+            engine (str): "online" (gTTS), "offline" (pyttsx3) or "auto" to
+                try online first and fall back to offline
+        Returns:
+            str: Path of the audio file, or None if the conversion failed
         """
         # Create output directory if it doesn't exist
         os.makedirs(output_dir, exist_ok=True)
@@ -127,31 +736,187 @@ class PDFToAudioConverter:
             output_path = os.path.join(output_dir, f"{base_name}.mp3")
         
         print("Starting conversion process...")
+        self._cancel.clear()
+        profiler = self.start_profile()
+        profiler.set_total_pages(*self._conversion_size(pdf_path, page_range))
+        status = self._convert_range(pdf_path, page_range, output_path, engine)
+        self.last_profile = profiler.finish()
+        print(f"Profile: {profiler.summary()}")
         
-        # Extract text from PDF
-        text = self.extract_text_from_pdf(pdf_path, page_range)
+        if status == 'ok':
+            print(f"Conversion complete! Audio saved to: {output_path}")
+            return output_path
+        if status == 'empty':
+            print("No text could be extracted from the PDF.")
+        elif status == 'cancelled':
+            print("Conversion cancelled. Run it again to resume where it stopped.")
+        else:
+            print("Conversion failed. Please try again.")
+        return None
+
+    def _conversion_size(self, pdf_path, page_range):
+        """
+        Pages and characters a conversion covers, either None where unknown.
+        The characters are only known from the PDF's page index.
+        """
+        try:
+            index = self.page_index(pdf_path, build=False)
+            if index:
+                return len(index.select(page_range)), index.chars(page_range)
+            if page_range:
+                return page_range[1] - page_range[0] + 1, None
+            return self.page_cache.page_count(pdf_path, self.extractor_for(pdf_path)), None
+        except Exception:
+            return None, None
+
+    def _convert_range(self, pdf_path, page_range, output_path, engine):
+        """
+        Stream a page range of the PDF into one audio file.
         
-        # Preprocess the text
-        processed_text = self.preprocess_text(text)
+        Returns:
+            str: 'ok', 'empty' if the pages hold no text, 'cancelled' or 'failed'
+        """
+        # Start the text pipeline and wait for the first chunk
+        chunker = TextChunker(chunk_limit(self.synthesis_engine.backend))
+        chunks = self.iter_audio_chunks(pdf_path, page_range, chunker)
+        try:
+            first_chunk = next(chunks, None)
+        except ConversionCancelled:
+            return 'cancelled'
+        if first_chunk is None:
+            return 'empty'
         
-        # Detect language
-        language = self.detect_language(processed_text)
+        # Detect language from the start of the range
+        language = self.detect_language(first_chunk)
         print(f"Detected language: {language}")
         
         # Try online conversion first, fall back to offline if needed
-        print("Converting to audio...")
-        success = self.convert_to_audio(processed_text, output_path, language)
-        
-        if not success:
-            print("Online conversion failed. Falling back to offline conversion...")
-            success = self.convert_to_audio(processed_text, output_path, language, use_offline=True)
+        success = False
+        if engine != "offline":
+            print("Converting to audio...")
+            success = self.stream_to_audio(chain([first_chunk], chunks), output_path, language, chunker.index)
+        chunks.close()
         
+        if not success and not self.cancelled and engine != "online":
+            if engine == "auto":
+                print("Online conversion failed. Falling back to offline conversion...")
+            # Run the text stages again from the start of the range, in
+            # the offline engine's chunk size
+            chunks = self.iter_audio_chunks(pdf_path, page_range, TextChunker(chunk_limit(self.offline_pool)))
+            success = self.stream_to_offline_audio(chunks, output_path)
         if success:
-            print(f"Conversion complete! Audio saved to: {output_path}")
-        else:
-            print("Conversion failed. Please try again.")
+            return 'ok'
+        return 'cancelled' if self.cancelled else 'failed'
+
+    def convert_pdf_to_chapters(self, pdf_path, output_dir="audio_output", page_range=None, engine="auto",
+                                pages_per_part=DEFAULT_PAGES_PER_PART, parallel_chapters=2, chapters=None):
+        """
+        Convert a PDF to one audio file per chapter, plus a playlist and a
+        chapter index.
+        
+        Chapters come from the PDF outline; without one, the book is split
+        every `pages_per_part` pages. Chapters are converted independently,
+        several at a time and started in reading order, so the first ones
+        can be played while later ones are still being synthesized. A
+        chapter that failed can be converted again on its own by passing
+        its number in `chapters`.
+        
+        Files are written to <output_dir>/<pdf name>/: "01 - Title.mp3" and
+        so on, "chapters.json" (titles, pages, files and status of every
+        chapter) and "<pdf name>.m3u".
+        
+        Args:
+            pdf_path (str): Path to the PDF file
+            output_dir (str): Directory to save the book's directory in
+            page_range (tuple): Optional tuple of (start_page, end_page) for specific pages
+            engine (str): "online", "offline" or "auto", as for convert_pdf_to_audiobook
+            pages_per_part (int): Pages per part when the PDF has no outline
+            parallel_chapters (int): Number of chapters converted at the same time
+            chapters (list): Optional chapter numbers to convert; the others
+                keep their status from the existing chapter index
+        Returns:
+            str: Path of the chapter index if every selected chapter was
+                converted, or None
+        """
+        base_name = os.path.splitext(os.path.basename(pdf_path))[0]
+        if page_range:
+            base_name = f"{base_name}_pages_{page_range[0]}-{page_range[1]}"
+        book_dir = os.path.join(output_dir, base_name)
+        os.makedirs(book_dir, exist_ok=True)
+        index_path = os.path.join(book_dir, "chapters.json")
+        
+        try:
+            index = self.page_index(pdf_path, build=False)
+            if index:
+                plan = plan_chapters(index.outline, index.total_pages, page_range, pages_per_part)
+            else:
+                total_pages = self.page_cache.page_count(pdf_path, self.extractor_for(pdf_path))
+                plan = plan_chapters(read_outline(pdf_path), total_pages, page_range, pages_per_part)
+        except Exception as e:
+            print(f"Error reading PDF: {str(e)}")
+            return None
+        
+        # Keep the status of chapters from an earlier run of the same split
+        previous = {(chapter['start_page'], chapter['end_page']): chapter
+                    for chapter in load_chapter_index(index_path)}
+        for chapter in plan:
+            chapter['file'] = chapter_filename(chapter, len(plan))
+            earlier = previous.get((chapter['start_page'], chapter['end_page']), {})
+            chapter['status'] = earlier.get('status', 'pending')
+            chapter['seconds'] = earlier.get('seconds')
+        selected = [chapter for chapter in plan if not chapters or chapter['number'] in chapters]
+        
+        print(f"Converting {len(selected)} of {len(plan)} chapter(s) into {book_dir}...")
+        self._cancel.clear()
+        profiler = self.start_profile()
+        sizes = [self._conversion_size(pdf_path, (chapter['start_page'], chapter['end_page']))
+                 for chapter in selected]
+        chars = None if any(size[1] is None for size in sizes) else sum(size[1] for size in sizes)
+        profiler.set_total_pages(sum(size[0] or 0 for size in sizes), chars)
+        write_chapter_index(index_path, pdf_path, plan)
+        
+        def convert_chapter(chapter):
+            if self.cancelled:
+                return 'cancelled', None
+            start_time = time.perf_counter()
+            output_path = os.path.join(book_dir, chapter['file'])
+            try:
+                status = self._convert_range(
+                    pdf_path, (chapter['start_page'], chapter['end_page']), output_path, engine)
+            except Exception as e:
+                print(f"Error in chapter {chapter['number']}: {str(e)}")
+                status = 'failed'
+            return status, round(time.perf_counter() - start_time, 3)
+        
+        with ThreadPoolExecutor(max_workers=max(1, parallel_chapters)) as executor:
+            futures = {executor.submit(convert_chapter, chapter): chapter for chapter in selected}
+            for future in as_completed(futures):
+                chapter = futures[future]
+                chapter['status'], chapter['seconds'] = future.result()
+                print(f"Chapter {chapter['number']}/{len(plan)} ({chapter['title']}): {chapter['status']}")
+                write_chapter_index(index_path, pdf_path, plan)
+        
+        write_playlist(os.path.join(book_dir, f"{base_name}.m3u"), plan)
+        self.last_profile = profiler.finish()
+        print(f"Profile: {profiler.summary()}")
+        
+        if self.cancelled:
+            print("Conversion cancelled. Run it again to resume where it stopped.")
+            return None
+        failed = [chapter['number'] for chapter in selected if chapter['status'] == 'failed']
+        if failed:
+            print(f"{len(failed)} chapter(s) failed: {', '.join(map(str, failed))}. "
+                  f"Convert them again with --split --chapters {','.join(map(str, failed))}")
+            return None
+        print(f"Conversion complete! Chapters saved to: {book_dir}")
+        return index_path
 
 if __name__ == "__main__":
+    # Any command-line arguments select the non-interactive batch mode
+    if len(sys.argv) > 1:
+        from batch_convert import main
+        sys.exit(main())
+    
     # Example usage
     converter = PDFToAudioConverter()
     
@@ -163,33 +928,46 @@ if __name__ == "__main__":
     if not os.path.exists(pdf_path):
         print("Error: File does not exist!")
         exit(1)
+    
+    # One pass over the pages for the range checks and estimates below
+    try:
+        page_index = converter.page_index(pdf_path)
+    except Exception as e:
+        print(f"Error reading PDF: {str(e)}")
+        exit(1)
+    print(f"\nPDF: {page_index.describe()}")
+    if not page_index.chars():
+        print("No text could be extracted from the PDF.")
+        exit(1)
         
     # Get page range preference
     choice = input("Do you want to convert:\n1. Entire PDF\n2. Specific pages\nEnter your choice (1 or 2): ")
     
     page_range = None
     if choice == "2":
-        try:
-            with open(pdf_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                total_pages = len(pdf_reader.pages)
-                print(f"\nTotal pages in PDF: {total_pages}")
+        total_pages = page_index.total_pages
+        print(f"\nTotal pages in PDF: {total_pages}")
+        
+        while True:
+            try:
+                start_page = int(input(f"Enter start page (1-{total_pages}): "))
+                end_page = int(input(f"Enter end page (1-{total_pages}): "))
                 
-                while True:
-                    try:
-                        start_page = int(input(f"Enter start page (1-{total_pages}): "))
-                        end_page = int(input(f"Enter end page (1-{total_pages}): "))
-                        
-                        if 1 <= start_page <= end_page <= total_pages:
-                            page_range = (start_page, end_page)
-                            break
-                        else:
-                            print("Invalid page range. Please try again.")
-                    except ValueError:
-                        print("Please enter valid numbers.")
-        except Exception as e:
-            print(f"Error reading PDF: {str(e)}")
-            exit(1)
+                problem = page_index.check_range((start_page, end_page))
+                if problem is None:
+                    page_range = (start_page, end_page)
+                    print(f"Pages {start_page}-{end_page}: {page_index.describe(page_range)}")
+                    break
+                else:
+                    print(problem)
+            except ValueError:
+                print("Please enter valid numbers.")
+    
+    # Chapter files can be played as soon as each one is done
+    split = input("Write one audio file per chapter? (y/n): ").strip().lower() == "y"
     
     # Convert PDF to audiobook
-    converter.convert_pdf_to_audiobook(pdf_path, page_range=page_range)
+    if split:
+        converter.convert_pdf_to_chapters(pdf_path, page_range=page_range)
+    else:
+        converter.convert_pdf_to_audiobook(pdf_path, page_range=page_range)
@@ -0,0 +1,274 @@
+import io
+import os
+import time
+import shutil
+import tempfile
+import urllib.parse
+import urllib.request
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from audio_writer import FrameSegmentWriter
+
+# pyttsx3 engine owned by the current offline worker process
+_offline_engine = None
+
+class GTTSBackend:
+    """Online synthesis through Google Translate's TTS via gTTS."""
+    name = "gtts"
+    # gTTS requests the ~100-character parts of a chunk one after another,
+    # so shorter chunks spread them over more of the engine's workers
+    chunk_chars = 1000
+
+    def synthesize(self, text, language='en'):
+        """Return the MP3 data for one chunk of text."""
+        from gtts import gTTS  # Imported on first use to keep startup fast
+        buffer = io.BytesIO()
+        gTTS(text=text, lang=language, slow=False).write_to_fp(buffer)
+        return buffer.getvalue()
+
+class HTTPTTSBackend:
+    """
+    Synthesis through a plain HTTP endpoint. The text and language are
+    POSTed as form fields ("text", "lang") and the response body is the
+    audio. Used to run the engine against a local stand-in TTS server.
+    """
+    def __init__(self, endpoint, timeout=30):
+        """
+        Args:
+            endpoint (str): URL of the TTS endpoint
+            timeout (float): Per-request timeout in seconds
+        """
+        # Different endpoints produce different audio for the same text
+        self.name = f"http:{endpoint}"
+        self.chunk_chars = 2000
+        self.endpoint = endpoint
+        self.timeout = timeout
+
+    def synthesize(self, text, language='en'):
+        """Return the audio data for one chunk of text."""
+        data = urllib.parse.urlencode({'text': text, 'lang': language}).encode('utf-8')
+        with urllib.request.urlopen(self.endpoint, data=data, timeout=self.timeout) as response:
+            return response.read()
+
+class SynthesisEngine:
+    """
+    Synthesizes text chunks concurrently on a thread pool. Each chunk is
+    retried on its own, and segments are yielded in chunk order so they can
+    be appended straight to the output file.
+    """
+    def __init__(self, backend=None, workers=4, retries=3, retry_delay=1.0, cache=None):
+        """
+        Args:
+            backend: Object with a synthesize(text, language) method
+                returning audio bytes. Defaults to gTTS.
+            workers (int): Number of chunks synthesized at the same time
+            retries (int): Extra attempts per chunk before giving up
+            retry_delay (float): Delay before the first retry in seconds,
+                doubled on every further attempt
+            cache (AudioChunkCache): Optional cache of synthesized chunks;
+                cached chunks are not sent to the backend again
+        """
+        self.backend = backend or GTTSBackend()
+        self.workers = max(1, workers)
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.cache = cache
+        self.last_stats = None
+        # Called as hook(latency=, cpu=, chars=, cached=, language=, page=) for every chunk
+        self.chunk_hooks = []
+
+    def synthesize_chunk(self, text, language='en'):
+        """
+        Synthesize a single chunk, retrying failed attempts with
+        exponential backoff. Chunks found in the cache are returned
+        without calling the backend.
+
+        Returns:
+            bytes: Audio data for the chunk
+        """
+        return self._synthesize(text, language, self.cache)[0]
+
+    def _synthesize(self, text, language, cache):
+        """Synthesize a chunk and return (audio, whether it came from the cache)."""
+        start_wall, start_cpu = time.perf_counter(), time.thread_time()
+        if cache:
+            audio = cache.get(text, language, self.backend.name)
+            if audio is not None:
+                self._notify_chunk(text, language, start_wall, start_cpu, cached=True)
+                return audio, True
+        
+        for attempt in range(self.retries + 1):
+            try:
+                audio = self.backend.synthesize(text, language)
+                if cache:
+                    cache.put(text, language, self.backend.name, audio)
+                self._notify_chunk(text, language, start_wall, start_cpu, cached=False)
+                return audio, False
+            except Exception as e:
+                last_error = e
+                if attempt < self.retries:
+                    time.sleep(self.retry_delay * 2 ** attempt)
+        raise Exception(f"Chunk synthesis failed after {self.retries + 1} attempts: {str(last_error)}")
+
+    def _notify_chunk(self, text, language, start_wall, start_cpu, cached):
+        """Pass the timing of a finished chunk to the chunk hooks."""
+        for hook in self.chunk_hooks:
+            hook(latency=time.perf_counter() - start_wall, cpu=time.thread_time() - start_cpu,
+                 chars=len(text), cached=cached, language=language, page=getattr(text, 'page', None))
+
+    def synthesize_chunks(self, chunks, language='en'):
+        """
+        Synthesize chunks concurrently and yield their audio in order.
+        At most twice as many chunks as workers are in flight, so a long
+        book never has more than a handful of segments in memory.
+
+        Args:
+            chunks: Iterable of text chunks
+            language (str): Language code passed to the backend
+        Yields:
+            bytes: Audio data for each chunk, in chunk order
+        """
+        return self.synthesize_tagged_chunks((chunk, language) for chunk in chunks)
+
+    def synthesize_tagged_chunks(self, tagged_chunks, cache=None, stats=None):
+        """
+        Like synthesize_chunks, but every chunk carries its own language.
+        Several calls may run at the same time (one per chapter, say); pass
+        `stats` to get this call's figures, as last_stats belongs to
+        whichever call finished last.
+
+        Args:
+            tagged_chunks: Iterable of (text, language) tuples
+            cache: Optional cache to use for this call instead of the
+                engine's own (anything with get() and put())
+            stats (dict): Optional dict filled in with this call's
+                'backend', 'chunks', 'cached_chunks', 'seconds' and
+                'chunks_per_second' once it ends
+        Yields:
+            bytes: Audio data for each chunk, in chunk order
+        """
+        start_time = time.perf_counter()
+        completed = 0
+        cache_hits = 0
+        pending = deque()
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+        try:
+            for chunk, language in tagged_chunks:
+                pending.append(executor.submit(self._synthesize, chunk, language, cache or self.cache))
+                # Hand over finished segments without waiting for the window to fill
+                while pending and (pending[0].done() or len(pending) >= self.workers * 2):
+                    audio, cached = pending.popleft().result()
+                    cache_hits += cached
+                    yield audio
+                    completed += 1
+            while pending:
+                audio, cached = pending.popleft().result()
+                cache_hits += cached
+                yield audio
+                completed += 1
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=False)
+            elapsed = time.perf_counter() - start_time
+            self.last_stats = {
+                'backend': self.backend.name,
+                'chunks': completed,
+                'cached_chunks': cache_hits,
+                'seconds': elapsed,
+                'chunks_per_second': completed / elapsed if elapsed > 0 else 0.0,
+            }
+            if stats is not None:
+                stats.update(self.last_stats)
+
+def _init_offline_worker():
+    """Create the pyttsx3 engine this worker process uses for all its chunks."""
+    global _offline_engine
+    import pyttsx3
+    _offline_engine = pyttsx3.init()
+
+def _synthesize_offline(text, segment_path):
+    """
+    Synthesize one chunk to a segment file in an offline worker process.
+
+    Returns:
+        tuple: (segment_path, wall seconds, CPU seconds)
+    """
+    start_wall, start_cpu = time.perf_counter(), time.process_time()
+    _offline_engine.save_to_file(text, segment_path)
+    _offline_engine.runAndWait()
+    return segment_path, time.perf_counter() - start_wall, time.process_time() - start_cpu
+
+class OfflineSynthesisPool:
+    """
+    Offline synthesis spread over worker processes, each with its own
+    pyttsx3 engine (one engine can't be driven from several threads). Each
+    chunk becomes a segment file; finished segments are appended to the
+    output in chunk order and deleted right away.
+    """
+    def __init__(self, workers=None):
+        """
+        Args:
+            workers (int): Number of worker processes. Defaults to the
+                number of CPUs.
+        """
+        self.workers = workers or os.cpu_count() or 1
+        # pyttsx3 has no request size limit; longer chunks mean fewer segments
+        self.chunk_chars = 4000
+        self.last_stats = None
+        # Called as hook(latency=, cpu=, chars=, cached=, language=, page=) for every chunk
+        self.chunk_hooks = []
+
+    def synthesize_to_file(self, chunks, output_path):
+        """
+        Synthesize text chunks and merge them into one audio file.
+
+        Args:
+            chunks: Iterable of text chunks
+            output_path (str): Path of the audio file to write
+        Returns:
+            dict: This call's 'backend', 'chunks', 'seconds' and
+                'chunks_per_second'; calls may run at the same time, so
+                last_stats can belong to another one
+        """
+        start_time = time.perf_counter()
+        segment_dir = tempfile.mkdtemp(prefix="offline_segments_")
+        pending = deque()
+        writer = FrameSegmentWriter(output_path)
+        try:
+            with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_offline_worker) as executor:
+                def merge_next():
+                    future, chars, page = pending.popleft()
+                    segment_path, latency, cpu = future.result()
+                    for hook in self.chunk_hooks:
+                        hook(latency=latency, cpu=cpu, chars=chars, cached=False, language=None, page=page)
+                    writer.append_file(segment_path)
+                    os.remove(segment_path)
+
+                try:
+                    for i, chunk in enumerate(chunks):
+                        segment_path = os.path.join(segment_dir, f"segment_{i:06d}.wav")
+                        pending.append((executor.submit(_synthesize_offline, chunk, segment_path),
+                                        len(chunk), getattr(chunk, 'page', None)))
+                        while pending and (pending[0][0].done() or len(pending) >= self.workers * 2):
+                            merge_next()
+                    while pending:
+                        merge_next()
+                finally:
+                    # Cancel queued chunks before leaving the executor waits for them
+                    for future, _, _ in pending:
+                        future.cancel()
+            if not writer.segments:
+                raise Exception("No text to synthesize")
+        finally:
+            writer.close()
+            shutil.rmtree(segment_dir, ignore_errors=True)
+            completed = writer.segments
+            elapsed = time.perf_counter() - start_time
+            stats = self.last_stats = {
+                'backend': 'pyttsx3',
+                'chunks': completed,
+                'seconds': elapsed,
+                'chunks_per_second': completed / elapsed if elapsed > 0 else 0.0,
+            }
+        return stats
@@ -0,0 +1,165 @@
+import re
+import threading
+from collections import deque, Counter
+
+# Lines that are nothing but a page number: "12", "Page 12", "12 of 300", "xiv"
+_PAGE_NUMBER = re.compile(
+    r'^(?:page\s+)?'
+    r'(?:\d+|(?=[ivxlcdm])m{0,4}(?:cm|cd|d?c{0,3})(?:xc|xl|l?x{0,3})(?:ix|iv|v?i{0,3}))'
+    r'(?:\s*(?:of|/)\s*\d+)?$', re.IGNORECASE)
+
+# A word broken over two lines with a hyphen, continuing in lower case
+_LINE_HYPHENATION = re.compile(r'(\w)-[ \t]*\n\s*([a-z])')
+
+_WHITESPACE = re.compile(r'\s+')
+_DIGITS = re.compile(r'\d+')
+
+_tokenizer_lock = threading.Lock()
+_sent_tokenize = None
+
+def sent_tokenize(text):
+    """
+    Split text into sentences with nltk. nltk is imported, and the punkt
+    tokenizer downloaded if missing, on the first call rather than at import
+    time, so starting the app doesn't pay for it.
+    """
+    global _sent_tokenize
+    if _sent_tokenize is None:
+        with _tokenizer_lock:
+            if _sent_tokenize is None:
+                import nltk
+                try:
+                    nltk.data.find('tokenizers/punkt')
+                except LookupError:
+                    nltk.download('punkt')
+                _sent_tokenize = nltk.sent_tokenize
+    return _sent_tokenize(text)
+
+def line_signature(line):
+    """
+    Return the form of a line used to spot running headers and footers:
+    lower case, collapsed whitespace and every number replaced by "#", so
+    "Chapter 3 - page 41" and "Chapter 3 - page 42" count as the same line.
+    """
+    return _DIGITS.sub('#', _WHITESPACE.sub(' ', line).strip().lower())
+
+class TextCleaner:
+    """
+    Streaming text cleaner. Pages are cleaned one at a time: running
+    headers and footers are found with a frequency index of the lines at
+    the top and bottom of the surrounding pages and dropped, along with bare
+    page numbers; words hyphenated across lines (and across page breaks)
+    are re-joined, and the result is produced sentence by sentence.
+    """
+    def __init__(self, edge_lines=2, lookahead=4, window=12, min_repeats=3, min_share=0.4):
+        """
+        Args:
+            edge_lines (int): Lines at the top and at the bottom of each page
+                that are checked for headers and footers
+            lookahead (int): Pages read ahead before a page is cleaned, so
+                the first pages of a book can be judged too
+            window (int): Number of recent pages in the frequency index
+            min_repeats (int): Minimum number of pages a line must appear
+                on to count as a header or footer
+            min_share (float): Minimum share of the pages in the window a
+                line must appear on to count as a header or footer
+        """
+        self.edge_lines = edge_lines
+        self.lookahead = lookahead
+        self.window = max(window, lookahead + 1)
+        self.min_repeats = min_repeats
+        self.min_share = min_share
+
+    def clean_pages(self, page_texts):
+        """
+        Clean pages in order, holding at most `lookahead` pages back.
+
+        Args:
+            page_texts: Iterable of (page_num, text) tuples
+        Yields:
+            tuple: (page_num, cleaned_text) with whitespace collapsed
+        """
+        pending = deque()
+        window = deque()
+        counts = Counter()
+        for page_num, text in page_texts:
+            lines = [line for line in text.splitlines() if line.strip()]
+            signatures = {line_signature(lines[i]) for i in self._edge_indices(lines)}
+            counts.update(signatures)
+            window.append(signatures)
+            if len(window) > self.window:
+                for signature in window.popleft():
+                    counts[signature] -= 1
+                    if not counts[signature]:
+                        del counts[signature]
+
+            pending.append((page_num, lines))
+            if len(pending) > self.lookahead:
+                yield self._clean_page(*pending.popleft(), counts, len(window))
+        while pending:
+            yield self._clean_page(*pending.popleft(), counts, len(window))
+
+    def iter_sentences(self, page_texts):
+        """
+        Clean pages and yield complete sentences one at a time. The last
+        sentence of each page is held back until the next page, so
+        sentences and hyphenated words running across a page break are
+        kept whole.
+
+        Args:
+            page_texts: Iterable of (page_num, text) tuples
+        Yields:
+            str: Cleaned sentences in reading order
+        """
+        for _, sentences in self.iter_page_sentences(page_texts):
+            yield from sentences
+
+    def iter_page_sentences(self, page_texts):
+        """
+        Like iter_sentences, but grouped by page: each page gets the
+        sentences that end on it, so a sentence running across a page break
+        belongs to the page it finishes on. Every page is yielded, with an
+        empty list if no sentence ends on it.
+
+        Args:
+            page_texts: Iterable of (page_num, text) tuples
+        Yields:
+            tuple: (page_num, list of sentences)
+        """
+        carry = ""
+        pending = None
+        for page_num, text in self.clean_pages(page_texts):
+            # The carry of the page before moves on to this one
+            if pending:
+                yield pending
+            sentences = []
+            if text:
+                if carry.endswith('-') and text[0].islower():
+                    text = carry[:-1] + text
+                elif carry:
+                    text = f"{carry} {text}"
+                sentences = sent_tokenize(text)
+                carry = sentences.pop() if sentences else ""
+            pending = (page_num, sentences)
+        if pending:
+            if carry:
+                pending[1].append(carry)
+            yield pending
+
+    def _edge_indices(self, lines):
+        """Return the indices of the lines at the top and bottom of a page."""
+        edge = min(self.edge_lines, len(lines))
+        return set(range(edge)) | set(range(len(lines) - edge, len(lines)))
+
+    def _clean_page(self, page_num, lines, counts, pages_in_window):
+        """Drop headers, footers and page numbers, then re-join the page."""
+        threshold = max(self.min_repeats, self.min_share * pages_in_window)
+        edges = self._edge_indices(lines)
+        page_numbers = {i for i in edges if _PAGE_NUMBER.match(lines[i].strip())}
+        kept = [line for i, line in enumerate(lines)
+                if i not in edges or (i not in page_numbers and counts[line_signature(line)] < threshold)]
+        # A page made only of repeated lines (a slide deck, say) is content
+        if not kept:
+            kept = [line for i, line in enumerate(lines) if i not in page_numbers]
+        text = _LINE_HYPHENATION.sub(r'\1\2', '\n'.join(kept))
+        return page_num, _WHITESPACE.sub(' ', text).strip()